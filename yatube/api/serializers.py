@@ -0,0 +1,83 @@
+"""Сериализация постов и комментариев из строк ``values()``.
+
+Модели не создаются: запрос выбирает только колонки запрошенных
+полей, а строка переименовывается в словарь ответа. Поля ``id`` и
+ключ сортировки выбираются всегда — по ним строится курсор.
+"""
+from django.conf import settings
+
+
+class FieldError(ValueError):
+    """Клиент запросил поле, которого нет в ответе."""
+
+
+def _media_url(name):
+    return settings.MEDIA_URL + name if name else None
+
+
+# Имя поля в ответе -> (путь для values(), преобразование значения).
+POST_FIELDS = {
+    'id': ('id', None),
+    'text': ('text', None),
+    'pub_date': ('pub_date', None),
+    'author': ('author__username', None),
+    'group': ('group__slug', None),
+    'image': ('image', _media_url),
+    'thumbnail': ('image_thumbnail', lambda url: url or None),
+    'comments_count': ('comments_count', None),
+}
+POST_KEYS = ('id', 'pub_date')
+
+COMMENT_FIELDS = {
+    'id': ('id', None),
+    'author': ('author__username', None),
+    'text': ('text', None),
+    'created': ('created', None),
+}
+COMMENT_KEYS = ('id', 'created')
+
+
+def _user_fields(relation):
+    """Поля пользователя на одной из сторон подписки."""
+    return {
+        'id': ('id', None),
+        'username': (relation + '__username', None),
+        'posts_count': (relation + '__profile__posts_count', None),
+        'followers_count': (relation + '__profile__followers_count', None),
+    }
+
+
+# В списках подписок id — номер подписки: по нему идёт курсор.
+FOLLOWER_FIELDS = _user_fields('user')
+FOLLOWING_FIELDS = _user_fields('author')
+FOLLOW_KEYS = ('id',)
+
+
+class Serializer:
+    """Выбирает и переименовывает поля по параметру ``?fields=``."""
+
+    def __init__(self, fields, keys, requested=None):
+        names = list(fields)
+        if requested:
+            names = [name.strip() for name in requested.split(',')]
+            unknown = [name for name in names if name not in fields]
+            if unknown:
+                raise FieldError(
+                    'Неизвестные поля: %s.' % ', '.join(unknown)
+                )
+        self.fields = [(name,) + fields[name] for name in names]
+        self.paths = list(dict.fromkeys(
+            list(keys) + [path for _, path, _ in self.fields]
+        ))
+
+    def rows(self, queryset):
+        return queryset.values(*self.paths)
+
+    def __call__(self, rows):
+        return [
+            {
+                name: convert(row[path]) if convert else row[path]
+                for name, path, convert in self.fields
+            }
+            for row in rows
+        ]
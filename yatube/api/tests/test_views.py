@@ -0,0 +1,253 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters
+from posts.models import (
+    Comment, Follow, Group, Post, Profile, TimelineEntry
+)
+
+
+User = get_user_model()
+
+
+class ApiViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(13):
+            cls.post = Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Тестовый пост {i}'
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ура')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def get(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feeds_paginate_by_cursor(self):
+        """Ленты листаются курсором до конца без повторов."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': 'test_slug'}),
+            reverse('api:profile', kwargs={'username': 'auth'}),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                status, first = self.get(url, self.authorized_client)
+                self.assertEqual(status, 200)
+                self.assertEqual(first['results'][0]['id'], self.post.pk)
+                self.assertIsNone(first['previous'])
+                _, second = self.get(
+                    url, self.authorized_client, after=first['next']
+                )
+                ids = [post['id'] for post in first['results']]
+                ids += [post['id'] for post in second['results']]
+                self.assertEqual(len(set(ids)), 13)
+                self.assertIsNone(second['next'])
+
+    def test_selected_fields(self):
+        """В ответе только запрошенные поля, лишние колонки не читаются."""
+        with CaptureQueriesContext(connection) as queries:
+            status, data = self.get(
+                reverse('api:index'), fields='id,author', limit=2
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'author': 'auth'}
+        )
+        self.assertNotIn('"text"', queries[-1]['sql'])
+        status, data = self.get(reverse('api:index'), fields='id,password')
+        self.assertEqual(status, 400)
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии отдаются отдельно."""
+        _, post = self.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(post['text'], 'Тестовый пост 12')
+        self.assertEqual(post['group'], 'test_slug')
+        self.assertEqual(post['comments_count'], 1)
+        _, comments = self.get(
+            reverse('api:post_comments', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        status, _ = self.get(
+            reverse('api:post_detail', kwargs={'post_id': 1000})
+        )
+        self.assertEqual(status, 404)
+
+    def test_follow_requires_login(self):
+        """Лента подписок доступна только авторизованным."""
+        status, _ = self.get(reverse('api:follow_index'))
+        self.assertEqual(status, 401)
+
+    def test_gzip(self):
+        """Ответ сжимается, если клиент это поддерживает."""
+        response = self.client.get(
+            reverse('api:index'), {'limit': 100},
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 13)
+
+
+class FollowApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(5)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text='Тестовый пост')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def batch(self, data, client=None):
+        response = (client or self.authorized_client).post(
+            reverse('api:follow_batch'),
+            json.dumps(data),
+            content_type='application/json',
+        )
+        return response.status_code, json.loads(response.content)
+
+    def test_batch_follow(self):
+        """Подписки списком: один запрос на разбор имён, счётчики и лента
+        обновлены."""
+        names = [author.username for author in self.authors]
+        with CaptureQueriesContext(connection) as queries:
+            status, data = self.batch(
+                {'follow': names + ['reader', 'ghost']}
+            )
+        self.assertEqual(status, 200)
+        self.assertEqual(data['followed'], names[1:])
+        self.assertEqual(data['not_found'], ['ghost', 'reader'])
+        self.assertLess(len(queries), 20)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 5
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.authors[1]).followers_count, 1
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+
+    def test_repeated_batches_keep_counters(self):
+        """Повторённые пакеты оставляют счётчики равными числу
+        подписок."""
+        names = [author.username for author in self.authors]
+        for data in (
+            {'follow': names}, {'follow': names},
+            {'unfollow': names[:3]}, {'unfollow': names[:3]},
+            {'follow': names[1:], 'unfollow': names[3:]},
+        ):
+            with self.subTest(data=data):
+                self.batch(data)
+                self.batch(data)
+                Follow.objects.get_or_create(
+                    user=self.reader, author=self.authors[4]
+                )
+                self.assertEqual(set(counters.reconcile().values()), {0})
+
+    def test_batch_unfollow_queries(self):
+        """Число запросов отписки не зависит от числа авторов."""
+        for author in self.authors[1:]:
+            Follow.objects.create(user=self.reader, author=author)
+        counts = []
+        for names in (['author0'], ['author1', 'author2', 'author3']):
+            with CaptureQueriesContext(connection) as queries:
+                status, data = self.batch({'unfollow': names})
+            self.assertEqual(data['unfollowed'], names)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_batch_unfollow(self):
+        """Отписки списком снимают подписки и чистят ленту."""
+        status, data = self.batch(
+            {'unfollow': ['author0', 'author1'], 'follow': ['author2']}
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(data['unfollowed'], ['author0'])
+        self.assertEqual(data['followed'], ['author2'])
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.reader)
+                 .values_list('author__username', flat=True)),
+            ['author2']
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.authors[0]).followers_count, 0
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author=self.authors[0]
+        ).exists())
+
+    def test_batch_errors(self):
+        """Пакет требует авторизации и списка имён."""
+        status, _ = self.batch({'follow': ['author1']}, self.client)
+        self.assertEqual(status, 401)
+        status, _ = self.batch({'follow': 'author1'})
+        self.assertEqual(status, 400)
+        status, _ = self.batch({'follow': ['x'] * 101})
+        self.assertEqual(status, 400)
+        response = self.authorized_client.get(reverse('api:follow_batch'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_followers_and_following(self):
+        """Списки подписчиков и подписок листаются курсором."""
+        for author in self.authors[1:]:
+            Follow.objects.create(user=author, author=self.authors[0])
+        url = reverse('api:followers', kwargs={'username': 'author0'})
+        response = self.client.get(url, {'limit': 3})
+        first = json.loads(response.content)
+        second = json.loads(
+            self.client.get(url, {'limit': 3, 'after': first['next']}).content
+        )
+        names = [row['username'] for row in first['results']]
+        names += [row['username'] for row in second['results']]
+        self.assertEqual(
+            sorted(names), ['author1', 'author2', 'author3', 'author4',
+                            'reader']
+        )
+        self.assertIsNone(second['next'])
+        response = self.client.get(
+            reverse('api:following', kwargs={'username': 'reader'})
+        )
+        self.assertEqual(
+            json.loads(response.content)['results'][0]['username'],
+            'author0'
+        )
+        response = self.client.get(
+            reverse('api:followers', kwargs={'username': 'ghost'})
+        )
+        self.assertEqual(response.status_code, 404)
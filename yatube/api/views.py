@@ -0,0 +1,198 @@
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+
+from posts import follows, lookups, timeline
+from posts.models import Comment, Follow, Post
+from posts.paginators import CursorPaginator
+
+from .serializers import (
+    COMMENT_FIELDS, COMMENT_KEYS, FOLLOW_KEYS, FOLLOWER_FIELDS,
+    FOLLOWING_FIELDS, POST_FIELDS, POST_KEYS, FieldError, Serializer
+)
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+MAX_BATCH = 100
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def _response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def _error(detail, status):
+    return _response({'detail': detail}, status=status)
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def _page(request, queryset, fields, keys, ordering):
+    """Страница ответа с курсорами соседних страниц."""
+    try:
+        serializer = Serializer(fields, keys, request.GET.get('fields'))
+    except FieldError as error:
+        return _error(str(error), 400)
+    paginator = CursorPaginator(
+        serializer.rows(queryset),
+        _limit(request),
+        ordering=ordering,
+        transform=serializer,
+    )
+    page = paginator.page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return _response({
+        'results': page.object_list,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def _posts(request, queryset):
+    return _page(
+        request, queryset, POST_FIELDS, POST_KEYS, ('-pub_date', '-pk')
+    )
+
+
+@gzip_page
+@require_GET
+def index(request):
+    return _posts(request, Post.objects.all())
+
+
+@gzip_page
+@require_GET
+def group_posts(request, slug):
+    group = lookups.get_group(slug)
+    if group is None:
+        return _error('Группа не найдена.', 404)
+    return _posts(request, Post.objects.filter(group_id=group.pk))
+
+
+@gzip_page
+@require_GET
+def profile(request, username):
+    author_id = lookups.get_author_id(username)
+    if author_id is None:
+        return _error('Пользователь не найден.', 404)
+    return _posts(request, Post.objects.filter(author_id=author_id))
+
+
+@gzip_page
+@require_GET
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация.', 401)
+    return _posts(request, timeline.follow_feed(request.user))
+
+
+@gzip_page
+@require_GET
+def post_detail(request, post_id):
+    try:
+        serializer = Serializer(
+            POST_FIELDS, POST_KEYS, request.GET.get('fields')
+        )
+    except FieldError as error:
+        return _error(str(error), 400)
+    rows = serializer.rows(Post.objects.filter(pk=post_id))[:1]
+    if not rows:
+        return _error('Пост не найден.', 404)
+    return _response(serializer(rows)[0])
+
+
+@gzip_page
+@require_GET
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден.', 404)
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        COMMENT_KEYS,
+        ('created', 'pk'),
+    )
+
+
+def _follows(request, username, queryset_for, fields):
+    author_id = lookups.get_author_id(username)
+    if author_id is None:
+        return _error('Пользователь не найден.', 404)
+    return _page(
+        request, queryset_for(author_id), fields, FOLLOW_KEYS, ('-pk',)
+    )
+
+
+@gzip_page
+@require_GET
+def followers(request, username):
+    return _follows(
+        request, username,
+        lambda user_id: Follow.objects.filter(author_id=user_id),
+        FOLLOWER_FIELDS,
+    )
+
+
+@gzip_page
+@require_GET
+def following(request, username):
+    return _follows(
+        request, username,
+        lambda user_id: Follow.objects.filter(user_id=user_id),
+        FOLLOWING_FIELDS,
+    )
+
+
+def _usernames(data, name):
+    names = data.get(name, [])
+    if not isinstance(names, list) or not all(
+        isinstance(username, str) for username in names
+    ):
+        raise ValueError('Поле %s должно быть списком имён.' % name)
+    return names
+
+
+@require_POST
+def follow_batch(request):
+    """Подписки и отписки списком: ``{"follow": [...], "unfollow": [...]}``.
+
+    Все имена разрешаются одним запросом, неизвестные и собственное
+    имя возвращаются в ``not_found``.
+    """
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация.', 401)
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError('Ожидается объект.')
+        follow = _usernames(data, 'follow')
+        unfollow = _usernames(data, 'unfollow')
+    except ValueError as error:
+        return _error(str(error), 400)
+    if len(follow) + len(unfollow) > MAX_BATCH:
+        return _error('Не больше %s имён за запрос.' % MAX_BATCH, 400)
+    found = follows.resolve(request.user, follow + unfollow)
+    names = {author_id: username for username, author_id in found.items()}
+    followed = follows.follow_many(
+        request.user, [found[name] for name in follow if name in found]
+    )
+    unfollowed = follows.unfollow_many(
+        request.user, [found[name] for name in unfollow if name in found]
+    )
+    return _response({
+        'followed': sorted(names[author_id] for author_id in followed),
+        'unfollowed': sorted(names[author_id] for author_id in unfollowed),
+        'not_found': sorted(set(follow + unfollow) - set(found)),
+    })
@@ -0,0 +1,77 @@
+"""SQLite с настройками для конкурентной нагрузки.
+
+Каждое новое соединение получает PRAGMA из ``OPTIONS['pragmas']``
+поверх ``DEFAULT_PRAGMAS``: журнал WAL, в котором читатели не ждут
+писателя, ``synchronous=NORMAL``, кеш страниц, mmap и ``busy_timeout``.
+``OPTIONS['transaction_mode']`` задаёт режим ``BEGIN`` для atomic():
+с ``IMMEDIATE`` транзакция сразу берёт блокировку на запись и не
+получает «database is locked» при попытке повысить её посередине.
+Запрос вне транзакции, упавший на занятой базе, повторяется с паузой.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+
+# busy_timeout идёт первым: смене журнала тоже может понадобиться
+# подождать блокировку.
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05
+
+
+def is_locked(error):
+    return 'database is locked' in str(error)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    def _retry(self, method, *args):
+        # Курсор отдаёт ошибки sqlite3 как есть: в исключения
+        # django.db.utils их переводит только обёртка выше.
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                return method(*args)
+            except base.Database.OperationalError as error:
+                # Внутри транзакции повтор одного запроса не поможет:
+                # снимок уже устарел, повторять нужно транзакцию целиком.
+                if (not is_locked(error) or attempt == LOCK_RETRIES
+                        or self.connection.in_transaction):
+                    raise
+            time.sleep(LOCK_RETRY_DELAY * 2 ** attempt * random.random())
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = dict(DEFAULT_PRAGMAS, **params.pop('pragmas', {}))
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute('PRAGMA %s = %s' % (name, value))
+        return connection
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=SQLiteCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute('BEGIN %s' % self.transaction_mode)
+        else:
+            super()._start_transaction_under_autocommit()
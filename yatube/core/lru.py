@@ -0,0 +1,104 @@
+"""Локальный LRU-кеш процесса поверх общего кеша Django.
+
+Горячие ключи отдаются из словаря в памяти процесса без обращения
+к бэкенду кеша, промахи идут в общий кеш и только потом в загрузчик.
+Локальная запись живёт не дольше ``timeout`` секунд: сигналы сбрасывают
+её только в своём процессе, а в остальных она устаревает сама. Общий
+кеш сбрасывается сигналами для всех процессов сразу.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+
+_registry = []
+
+
+class LRUCache:
+    def __init__(self, name, maxsize, timeout):
+        self.name = name
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = 0
+        _registry.append(self)
+
+    def _shared_key(self, key):
+        return 'lru:%s:%s' % (
+            self.name, hashlib.md5(str(key).encode()).hexdigest()
+        )
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get(self, key, load):
+        """Значение по ключу; ``load(key)`` вызывается при промахе.
+
+        ``None`` от загрузчика не кешируется, чтобы несуществующие
+        ключи не вытесняли живые.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        value = cache.get(self._shared_key(key))
+        if value is not None:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            value = load(key)
+            if value is None:
+                return None
+            cache.set(self._shared_key(key), value, None)
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        cache.set(self._shared_key(key), value, None)
+        self._remember(key, value)
+
+    def delete(self, *keys):
+        keys = [key for key in keys if key]
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+        cache.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Очищает локальную часть; общий кеш чистится ``cache.clear()``."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.shared_hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.shared_hits) / total if total else 0,
+        }
+
+
+def stats():
+    """Статистика всех LRU-кешей этого процесса."""
+    return [lru.stats() for lru in _registry]
+
+
+def clear():
+    """Очищает локальную часть всех LRU-кешей процесса."""
+    for lru in _registry:
+        lru.clear()
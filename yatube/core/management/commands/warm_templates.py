@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import templating
+
+
+class Command(BaseCommand):
+    help = 'Разбирает все шаблоны заранее и проверяет их синтаксис.'
+
+    def handle(self, *args, **options):
+        count = templating.warm()
+        self.stdout.write(f'Загружено шаблонов: {count}')
@@ -0,0 +1,64 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import profiling, replicas
+
+
+logger = logging.getLogger('yatube.profiling')
+
+
+class ProfilingMiddleware:
+    """Замеряет запрос: время, SQL, рендер шаблонов и кеш лент.
+
+    Включается настройкой ``REQUEST_PROFILING``; итог отдаётся в
+    заголовке ``Server-Timing``, пишется в лог ``yatube.profiling``
+    и копится в сводке по имени маршрута.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        profiling.instrument_templates()
+
+    def __call__(self, request):
+        profile = profiling.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            profiling.stop()
+        wall = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        response['Server-Timing'] = profile.server_timing(wall)
+        logger.info(json.dumps(profile.summary(view, wall)))
+        profiling.record(view, profile, wall)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Привязывает к основной базе сессию, которая только что писала.
+
+    Должен стоять после ``SessionMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas.start_request()
+        response = self.get_response(request)
+        replicas.finish_request(request)
+        return response
@@ -0,0 +1,228 @@
+"""Профиль текущего запроса и сводная статистика по представлениям.
+
+Профиль живёт в thread-local на время запроса: SQL-запросы попадают
+в него через ``connection.execute_wrapper``, рендер шаблонов — через
+обёртку ``Template.render``, попадания в кеш лент — из
+``posts.feed_cache``. Сводка копится в общем кеше счётчиками
+``incr``, поэтому её видно из любого воркера.
+"""
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.base import Template
+
+
+VIEWS_KEY = 'profiling:views'
+TEMPLATES_KEY = 'profiling:templates'
+METRICS = (
+    'requests', 'wall_us', 'queries', 'db_us', 'template_us',
+    'cache_hits', 'cache_misses',
+)
+
+_local = threading.local()
+
+
+class Profile:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slow_queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        # Имя шаблона -> [число рендеров, суммарное время].
+        self.templates = {}
+        self.cache = {'hits': 0, 'misses': 0, 'stale': 0}
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для ``connection.execute_wrapper``."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.db_time += elapsed
+            entry = (elapsed, sql)
+            if len(self.slow_queries) < settings.PROFILING_SLOW_QUERIES:
+                heapq.heappush(self.slow_queries, entry)
+            else:
+                heapq.heappushpop(self.slow_queries, entry)
+
+    def add_template(self, name, elapsed):
+        entry = self.templates.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def summary(self, view, wall):
+        return {
+            'view': view,
+            'wall_ms': round(wall * 1000, 2),
+            'queries': self.query_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache': self.cache,
+            'templates': {
+                name: [count, round(elapsed * 1000, 2)]
+                for name, (count, elapsed) in self.templates.items()
+            },
+            'slow_queries': [
+                [round(elapsed * 1000, 2), sql]
+                for elapsed, sql in sorted(self.slow_queries, reverse=True)
+            ],
+        }
+
+    def server_timing(self, wall):
+        return ', '.join((
+            'total;dur=%.2f' % (wall * 1000),
+            'db;dur=%.2f;desc="%s queries"' % (
+                self.db_time * 1000, self.query_count
+            ),
+            'tpl;dur=%.2f' % (self.template_time * 1000),
+            'cache;desc="%s hits, %s misses"' % (
+                self.cache['hits'], self.cache['misses']
+            ),
+        ))
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+def start():
+    _local.profile = Profile()
+    return _local.profile
+
+
+def stop():
+    _local.profile = None
+
+
+def count_cache(event):
+    profile = current()
+    if profile is not None:
+        profile.cache[event] += 1
+
+
+def instrument_templates():
+    """Подменяет ``Template.render``, чтобы мерить время рендера.
+
+    Время каждого шаблона, в том числе каждого ``{% include %}`` и
+    inclusion-тега, копится по его имени и включает вложенные шаблоны;
+    общее время рендера — это время внешних вызовов.
+    """
+    if getattr(Template.render, 'profiled', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        profile = current()
+        if profile is None:
+            return original(self, context)
+        outermost = not profile.template_depth
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            profile.template_depth -= 1
+            profile.add_template(
+                self.origin.template_name or '<string>', elapsed
+            )
+            if outermost:
+                profile.template_time += elapsed
+
+    render.profiled = True
+    Template.render = render
+
+
+def _key(view, metric):
+    return 'profiling:%s:%s' % (view, metric)
+
+
+def _template_key(name, metric):
+    return 'profiling:template:%s:%s' % (name, metric)
+
+
+def _remember(key, name):
+    names = cache.get(key) or set()
+    if name not in names:
+        cache.set(key, names | {name}, None)
+
+
+def _add(key, delta):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+def record(view, profile, wall):
+    """Добавляет запрос в сводку по представлению."""
+    _remember(VIEWS_KEY, view)
+    values = (
+        1, wall, profile.query_count, profile.db_time,
+        profile.template_time, profile.cache['hits'],
+        profile.cache['misses'],
+    )
+    for metric, value in zip(METRICS, values):
+        if metric.endswith('_us'):
+            value = int(value * 1000000)
+        _add(_key(view, metric), value)
+    slow_key = _key(view, 'slow')
+    slowest = cache.get(slow_key, []) + [
+        [round(elapsed * 1000, 2), sql]
+        for elapsed, sql in profile.slow_queries
+    ]
+    cache.set(
+        slow_key,
+        heapq.nlargest(settings.PROFILING_SLOW_QUERIES, slowest),
+        None,
+    )
+    for name, (count, elapsed) in profile.templates.items():
+        _remember(TEMPLATES_KEY, name)
+        _add(_template_key(name, 'count'), count)
+        _add(_template_key(name, 'us'), int(elapsed * 1000000))
+
+
+def stats():
+    """Сводка по представлениям, самые затратные первыми."""
+    rows = []
+    for view in cache.get(VIEWS_KEY) or ():
+        values = cache.get_many([_key(view, metric) for metric in METRICS])
+        totals = {
+            metric: values.get(_key(view, metric), 0) for metric in METRICS
+        }
+        requests = totals['requests'] or 1
+        rows.append({
+            'view': view,
+            'requests': totals['requests'],
+            'total_ms': totals['wall_us'] / 1000,
+            'avg_ms': totals['wall_us'] / 1000 / requests,
+            'avg_queries': totals['queries'] / requests,
+            'avg_db_ms': totals['db_us'] / 1000 / requests,
+            'avg_template_ms': totals['template_us'] / 1000 / requests,
+            'cache_hits': totals['cache_hits'],
+            'cache_misses': totals['cache_misses'],
+            'slow_queries': cache.get(_key(view, 'slow'), []),
+        })
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def template_stats():
+    """Время рендера по шаблонам, самые затратные первыми."""
+    rows = []
+    for name in cache.get(TEMPLATES_KEY) or ():
+        count = cache.get(_template_key(name, 'count'), 0)
+        total = cache.get(_template_key(name, 'us'), 0) / 1000
+        rows.append({
+            'template': name,
+            'renders': count,
+            'total_ms': total,
+            'avg_ms': total / (count or 1),
+        })
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
@@ -0,0 +1,76 @@
+"""Чтение лент с реплик базы.
+
+Представления, помеченные ``read_from_replica``, на время работы
+читают со случайной реплики из ``settings.DATABASE_REPLICAS``; всё
+остальное, а также любые записи и сессии, идут в ``default``. После
+запроса, который что-то записал, сессия на ``REPLICA_PIN_SECONDS``
+привязывается к основной базе, чтобы автор сразу видел свой пост,
+даже если реплика отстаёт.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+
+PIN_KEY = '_replica_pin_until'
+SAFE_METHODS = ('GET', 'HEAD')
+# Эти приложения всегда читаются с основной базы.
+PRIMARY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        return current()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+
+def current():
+    """Реплика, с которой сейчас читает поток, или None."""
+    return getattr(_state, 'replica', None)
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    return bool(session) and session.get(PIN_KEY, 0) > time.time()
+
+
+def read_from_replica(view):
+    """Отдаёт чтение представления реплике, если сессия не привязана
+    к основной базе."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or request.method not in SAFE_METHODS
+                or is_pinned(request)):
+            return view(request, *args, **kwargs)
+        _state.replica = random.choice(replicas)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+def start_request():
+    _state.wrote = False
+
+
+def finish_request(request):
+    """Привязывает сессию к основной базе, если запрос что-то записал."""
+    wrote, _state.wrote = getattr(_state, 'wrote', False), False
+    if wrote and hasattr(request, 'session'):
+        request.session[PIN_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
@@ -0,0 +1,43 @@
+"""Прогрев кешированного загрузчика шаблонов.
+
+С ``cached.Loader`` каждый шаблон разбирается один раз на процесс, но
+по умолчанию — при первом запросе, которому он понадобился. ``warm()``
+разбирает все шаблоны проекта и приложений заранее, при старте
+воркера, заодно проверяя их синтаксис.
+"""
+import os
+
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.utils import get_app_template_dirs
+
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов движка и приложений."""
+    dirs = list(engine.dirs) + list(get_app_template_dirs('templates'))
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    names.add(
+                        os.path.relpath(path, directory)
+                        .replace(os.sep, '/')
+                    )
+    return sorted(names)
+
+
+def warm():
+    """Загружает все шаблоны и возвращает их число."""
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            backend.engine.get_template(name)
+            count += 1
+    return count
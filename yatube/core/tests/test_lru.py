@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core import lru
+from core.lru import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.lru = LRUCache('test', maxsize=2, timeout=30)
+        self.addCleanup(lru._registry.remove, self.lru)
+        self.loads = []
+
+    def load(self, key):
+        self.loads.append(key)
+        return key.upper() if key != 'missing' else None
+
+    def test_local_then_shared_then_load(self):
+        """Промах идёт в общий кеш и только потом в загрузчик."""
+        self.assertEqual(self.lru.get('a', self.load), 'A')
+        self.assertEqual(self.lru.get('a', self.load), 'A')
+        self.lru.clear()
+        self.assertEqual(self.lru.get('a', self.load), 'A')
+        self.assertEqual(self.loads, ['a'])
+        stats = self.lru.stats()
+        self.assertEqual(
+            (stats['hits'], stats['shared_hits'], stats['misses']),
+            (0, 1, 0)
+        )
+
+    def test_bounded_size(self):
+        """Самая давно запрошенная запись вытесняется первой."""
+        for key in ('a', 'b', 'a', 'c'):
+            self.lru.get(key, self.load)
+        self.assertEqual(list(self.lru._data), ['a', 'c'])
+        self.assertEqual(self.lru.stats()['size'], 2)
+
+    def test_missing_not_cached(self):
+        """Отсутствующий ключ не кешируется."""
+        self.assertIsNone(self.lru.get('missing', self.load))
+        self.assertIsNone(self.lru.get('missing', self.load))
+        self.assertEqual(self.loads, ['missing', 'missing'])
+
+    def test_delete_and_timeout(self):
+        """Удаление сбрасывает обе части, локальная запись устаревает."""
+        self.lru.get('a', self.load)
+        self.lru.delete('a')
+        self.lru.get('a', self.load)
+        self.assertEqual(self.loads, ['a', 'a'])
+        cache.delete(self.lru._shared_key('a'))
+        with mock.patch('core.lru.time.monotonic', return_value=1e12):
+            self.lru.get('a', self.load)
+        self.assertEqual(self.loads, ['a', 'a', 'a'])
+        self.assertEqual(self.lru.stats()['hit_rate'], 0)
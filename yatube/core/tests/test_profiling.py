@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ несёт заголовок Server-Timing с SQL и шаблонами."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('tpl;dur=', timing)
+
+    def test_stats_by_view(self):
+        """Сводка копится по имени маршрута вместе с кешем лент."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        row = next(
+            row for row in profiling.stats() if row['view'] == 'posts:index'
+        )
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['avg_queries'], 0)
+        self.assertGreater(row['avg_template_ms'], 0)
+        self.assertEqual((row['cache_hits'], row['cache_misses']), (1, 1))
+        self.assertTrue(row['slow_queries'])
+
+    def test_template_stats(self):
+        """Время копится по каждому шаблону, include считаются поштучно."""
+        for i in range(2):
+            Post.objects.create(author=self.user, text=f'Ещё пост {i}')
+        response = self.client.get(
+            reverse('posts:post_search'), {'q': 'пост'}
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = {row['template']: row for row in profiling.template_stats()}
+        self.assertEqual(rows['includes/article.html']['renders'], 3)
+        self.assertEqual(rows['posts/search.html']['renders'], 1)
+        self.assertGreater(rows['posts/search.html']['total_ms'], 0)
+
+    def test_stats_page_for_staff(self):
+        """Страница сводки доступна только сотрудникам."""
+        url = reverse('core:profiling')
+        self.client.get(reverse('posts:index'))
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        response = staff_client.get(url)
+        self.assertContains(response, 'posts:index')
+        self.assertContains(response, 'posts/index.html')
+        user_client = Client()
+        user_client.force_login(self.user)
+        self.assertEqual(user_client.get(url).status_code, 302)
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        """Без настройки middleware не подключается."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import replicas
+from posts.models import Post, Profile
+
+
+User = get_user_model()
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    """Основная база — тестовая, реплика — отдельный файл SQLite.
+
+    Реплика не получает изменений из основной базы, поэтому видно,
+    откуда прочитана страница.
+    """
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.dir, 'replica.sqlite3'),
+        )
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        User.objects.using(REPLICA).create(
+            pk=cls.user.pk, username='auth'
+        )
+        Profile.objects.using(REPLICA).create(user_id=cls.user.pk)
+        Post.objects.create(author=cls.user, text='Пост с основной базы')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_read_from_replica(self):
+        """Ленты читаются с реплики, запись идёт в основную базу."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, 'Пост с основной базы')
+        self.assertEqual(Post.objects.using(REPLICA).count(), 0)
+
+    def test_session_pinned_after_write(self):
+        """После записи сессия читает из основной базы."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'}
+        )
+        self.assertTrue(Post.objects.filter(text='Свежий пост').exists())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+        self.assertNotContains(self.client.get(reverse('posts:index')),
+                               'Свежий пост')
+
+    def test_router(self):
+        """Вне помеченных представлений всё идёт в основную базу."""
+        router = replicas.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertEqual(router.db_for_write(Post), 'default')
@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from core.db.sqlite3.base import DatabaseWrapper
+
+
+DURATION = 0.5
+READERS = 3
+
+
+class SQLiteTuningTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def database(self, name, cleanup=True, **pragmas):
+        """Соединение с файловой базой ``name`` через наш бэкенд."""
+        settings = dict(
+            connection.settings_dict,
+            NAME=os.path.join(self.dir, name),
+            OPTIONS={'pragmas': pragmas},
+        )
+        database = DatabaseWrapper(settings, alias=name)
+        if cleanup:
+            self.addCleanup(database.close)
+        return database
+
+    def prepare(self, name, **pragmas):
+        database = self.database(name, **pragmas)
+        with database.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS item '
+                '(id INTEGER PRIMARY KEY, text TEXT)'
+            )
+            cursor.execute("INSERT INTO item (text) VALUES ('первый')")
+        return database
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает WAL и остальные PRAGMA."""
+        database = self.prepare('tuned.sqlite3', busy_timeout=1234)
+        with database.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def read_during_write(self, name, journal_mode):
+        self.prepare(name, journal_mode=journal_mode)
+        pragmas = {'journal_mode': journal_mode, 'busy_timeout': 0}
+        writer = self.database(name, **pragmas)
+        reader = self.database(name, **pragmas)
+        with writer.cursor() as cursor:
+            cursor.execute('BEGIN EXCLUSIVE')
+            cursor.execute("INSERT INTO item (text) VALUES ('второй')")
+            try:
+                with reader.cursor() as read:
+                    read.execute('SELECT COUNT(*) FROM item')
+                    return read.fetchone()[0]
+            finally:
+                cursor.execute('ROLLBACK')
+
+    def test_readers_not_blocked_by_writer(self):
+        """В WAL чтение идёт, пока писатель держит блокировку."""
+        self.assertEqual(self.read_during_write('wal.sqlite3', 'WAL'), 1)
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            self.read_during_write('delete.sqlite3', 'DELETE')
+
+    def test_locked_query_retried(self):
+        """Чтение на занятой базе повторяется и проходит после снятия
+        блокировки."""
+        name = 'retry.sqlite3'
+        self.prepare(name, journal_mode='DELETE')
+        pragmas = {'journal_mode': 'DELETE', 'busy_timeout': 0}
+        writer = self.database(name, **pragmas)
+        reader = self.database(name, **pragmas)
+        reader.ensure_connection()
+        with writer.cursor() as cursor:
+            cursor.execute('BEGIN EXCLUSIVE')
+            cursor.execute("INSERT INTO item (text) VALUES ('второй')")
+
+        def release(delay):
+            with writer.cursor() as cursor:
+                cursor.execute('COMMIT')
+
+        with mock.patch(
+            'core.db.sqlite3.base.time.sleep', side_effect=release
+        ) as sleep:
+            with reader.cursor() as read:
+                read.execute('SELECT COUNT(*) FROM item')
+                self.assertEqual(read.fetchone()[0], 2)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_locked_query_in_transaction_not_retried(self):
+        """Внутри транзакции запрос на занятой базе не повторяется."""
+        name = 'atomic.sqlite3'
+        self.prepare(name, journal_mode='DELETE')
+        pragmas = {'journal_mode': 'DELETE', 'busy_timeout': 0}
+        writer = self.database(name, **pragmas)
+        reader = self.database(name, **pragmas)
+        reader.ensure_connection()
+        with writer.cursor() as cursor:
+            cursor.execute('BEGIN EXCLUSIVE')
+        with reader.cursor() as read:
+            read.execute('BEGIN')
+            with mock.patch('core.db.sqlite3.base.time.sleep') as sleep:
+                with self.assertRaisesMessage(
+                    OperationalError, 'database is locked'
+                ):
+                    read.execute('SELECT COUNT(*) FROM item')
+            read.execute('ROLLBACK')
+        with writer.cursor() as cursor:
+            cursor.execute('ROLLBACK')
+        sleep.assert_not_called()
+
+    def throughput(self, name, journal_mode):
+        """Сколько чтений и записей успевают потоки за DURATION."""
+        self.prepare(name, journal_mode=journal_mode)
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + DURATION
+
+        def work(kind, sql):
+            database = self.database(
+                name, cleanup=False, journal_mode=journal_mode,
+                busy_timeout=200,
+            )
+            done = errors = 0
+            while time.monotonic() < deadline:
+                try:
+                    with database.cursor() as cursor:
+                        cursor.execute(sql)
+                        cursor.fetchall()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            database.close()
+            with lock:
+                counts[kind] += done
+                counts['errors'] += errors
+
+        threads = [threading.Thread(
+            target=work,
+            args=('writes', "INSERT INTO item (text) VALUES ('пост')"),
+        )] + [
+            threading.Thread(
+                target=work, args=('reads', 'SELECT COUNT(*) FROM item')
+            )
+            for _ in range(READERS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counts
+
+    def test_concurrent_throughput(self):
+        """Под записью WAL пропускает больше чтений без ошибок."""
+        wal = self.throughput('wal.sqlite3', 'WAL')
+        journal = self.throughput('delete.sqlite3', 'DELETE')
+        self.assertEqual(wal['errors'], 0)
+        self.assertGreater(wal['writes'], 0)
+        self.assertGreater(wal['reads'], journal['reads'])
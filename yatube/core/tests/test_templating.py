@@ -0,0 +1,32 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.template import engines
+from django.template.loaders.cached import Loader
+from django.test import SimpleTestCase
+
+from core import templating
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def setUp(self):
+        self.engine = engines['django'].engine
+        self.loader = self.engine.template_loaders[0]
+        self.loader.reset()
+
+    def test_cached_loader(self):
+        """Кешированный загрузчик включён и при DEBUG."""
+        self.assertTrue(settings.TEMPLATE_CACHE)
+        self.assertIsInstance(self.loader, Loader)
+
+    def test_warm_loads_all_templates(self):
+        """Прогрев разбирает шаблоны проекта и приложений."""
+        names = templating.template_names(self.engine)
+        self.assertIn('includes/article.html', names)
+        self.assertIn('admin/base.html', names)
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+        self.assertIn(f'Загружено шаблонов: {len(names)}', out.getvalue())
+        self.assertIn('includes/article.html', self.loader.get_template_cache)
+        self.assertEqual(len(self.loader.get_template_cache), len(names))
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from . import lru, profiling
+
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
@@ -17,3 +21,14 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def profiling_stats(request):
+    context = {
+        'enabled': settings.REQUEST_PROFILING,
+        'stats': profiling.stats(),
+        'templates': profiling.template_stats(),
+        'lookups': lru.stats(),
+    }
+    return render(request, 'core/profiling.html', context)
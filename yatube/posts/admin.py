@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Follow
 
 
@@ -10,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     list_editable = ('group',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        matches = search.ranked(search_term).values('post_id')
+        return queryset.filter(pk__in=matches), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from PIL import Image
+
+        from . import signals  # noqa: F401
+
+        # Защита от «бомб» при декодировании в воркере миниатюр.
+        Image.MAX_IMAGE_PIXELS = settings.POST_IMAGE_MAX_PIXELS
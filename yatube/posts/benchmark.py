@@ -0,0 +1,249 @@
+"""Нагрузочный прогон представлений ``posts``.
+
+``seed()`` наполняет базу заданными объёмами данных, ``run()`` обходит
+все маршруты ``posts.urls`` тестовым клиентом и для каждого меряет
+перцентили задержки, число SQL-запросов и пик выделенной памяти.
+Результат — словарь, пригодный для JSON, который ``compare()`` сверяет
+с сохранённым эталоном.
+"""
+import math
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.template import engines
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import search, transfer
+from .models import Comment, Follow, Group, Post, User
+from .urls import app_name, urlpatterns
+
+
+BATCH_SIZE = 500
+PERCENTILES = (50, 90, 99)
+# Страница ленты: include с {% url %} на каждый пост, как было раньше,
+# {% post_card %} с пустым кешем карточек и со всеми карточками в кеше.
+# Второй элемент — очищать ли кеш перед каждым рендером.
+RENDERERS = {
+    'include': (
+        "{% for post in page_obj %}{% include 'includes/article.html' %}"
+        "<a href=\"{% url 'posts:post_detail' post.id %}\"></a>"
+        "{% if post.group %}"
+        "<a href=\"{% url 'posts:group_list' post.group.slug %}\"></a>"
+        "{% endif %}{% endfor %}",
+        False,
+    ),
+    'post_card': (
+        '{% load feed_tags %}'
+        '{% for post in page_obj %}{% post_card post %}{% endfor %}',
+        True,
+    ),
+    'post_card_cached': (
+        '{% load feed_tags %}{% for post in page_obj %}'
+        '{% post_card post from page_obj %}{% endfor %}',
+        False,
+    ),
+}
+
+
+def seed(users=50, groups=5, posts=1000, comments=3000, follows=200,
+         seed_value=0):
+    """Создаёт пользователей, группы, посты, комментарии и подписки."""
+    rng = random.Random(seed_value)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed_value)
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence('bench{0}')
+    )
+    communities = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('bench-group-{0}')
+    )
+    Post.objects.bulk_create(
+        (
+            Post(
+                author=rng.choice(authors),
+                group=rng.choice(communities + [None]),
+                text=fake.text(max_nb_chars=400),
+            )
+            for _ in range(posts)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                post_id=rng.choice(post_ids),
+                author=rng.choice(authors),
+                text=fake.sentence(),
+            )
+            for _ in range(comments)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    pairs = {
+        (rng.choice(authors).pk, rng.choice(authors).pk)
+        for _ in range(follows)
+    }
+    Follow.objects.bulk_create(
+        [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs if user_id != author_id
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    transfer.rebuild_derived()
+
+
+def _targets():
+    """Аргументы маршрутов: обсуждаемый пост автора с подписками."""
+    post = (Post.objects.filter(author__follower__isnull=False,
+                                group__isnull=False)
+            .order_by('-comments_count').select_related('author', 'group')
+            .first()
+            or Post.objects.select_related('author', 'group').first())
+    if post is None:
+        raise ValueError('В базе нет постов для прогона.')
+    group = post.group or Group.objects.first()
+    terms = search.tokenize(post.text)
+    kwargs = {
+        'post_id': post.pk,
+        'username': post.author.username,
+        'slug': group.slug if group else '',
+    }
+    params = {'post_search': {'q': terms[0] if terms else 'post'}}
+    return post.author, kwargs, params
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+def measure(client, url, params=None, requests=50, warmup=5, cold=False,
+            prepare=None):
+    """Замеры одного URL: задержка, запросы к БД и память.
+
+    ``prepare()`` вызывается вне замера перед каждым запросом, чтобы
+    изменяющие данные маршруты каждый раз делали одну и ту же работу.
+    """
+    def get():
+        if prepare is not None:
+            prepare()
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        response = client.get(url, params)
+        return response, (time.perf_counter() - started) * 1000
+
+    for _ in range(warmup):
+        get()
+    timings = []
+    for _ in range(requests):
+        response, elapsed = get()
+        timings.append(elapsed)
+    # Запросы и память меряются отдельно: их учёт искажает задержку.
+    # Журнал запросов обнуляется в начале каждого запроса, поэтому
+    # его чистим до замера и читаем сразу после.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        get()
+    query_count = len(queries)
+    tracemalloc.start()
+    try:
+        get()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {'url': url, 'status': response.status_code}
+    for rank in PERCENTILES:
+        result[f'p{rank}_ms'] = round(percentile(timings, rank), 3)
+    result['mean_ms'] = round(statistics.mean(timings), 3)
+    result['max_ms'] = round(max(timings), 3)
+    result['queries'] = query_count
+    result['alloc_peak_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def run(requests=50, warmup=5, cold=False):
+    """Прогоняет все маршруты ``posts.urls`` от имени автора поста."""
+    user, kwargs, params = _targets()
+    client = Client()
+    client.force_login(user)
+    other = User.objects.exclude(pk=user.pk).first()
+    follow = {'user': user, 'author': other}
+    prepare = {
+        'profile_follow': lambda: Follow.objects.filter(**follow).delete(),
+        'profile_unfollow': lambda: Follow.objects.get_or_create(**follow),
+    }
+    results = {}
+    for pattern in urlpatterns:
+        route_kwargs = dict(kwargs)
+        if pattern.name in prepare:
+            route_kwargs['username'] = other.username
+        url = reverse(
+            f'{app_name}:{pattern.name}',
+            kwargs={
+                name: route_kwargs[name]
+                for name in pattern.pattern.converters
+            },
+        )
+        results[pattern.name] = measure(
+            client, url, params.get(pattern.name), requests, warmup, cold,
+            prepare.get(pattern.name),
+        )
+    return results
+
+
+def render_cards(posts=10, repeat=200):
+    """Задержка рендера страницы из ``posts`` постов каждым способом."""
+    page = list(Post.objects.for_feed()[:posts])
+    request = RequestFactory().get('/')
+    results = {}
+    for name, (source, cold) in RENDERERS.items():
+        template = engines['django'].from_string(source)
+        context = {'page_obj': page}
+        template.render(context, request)
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            started = time.perf_counter()
+            template.render(context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            f'p{rank}_ms': round(percentile(timings, rank), 3)
+            for rank in PERCENTILES
+        }
+    for name in ('post_card', 'post_card_cached'):
+        results[name]['speedup'] = round(
+            results['include']['p50_ms'] / results[name]['p50_ms'], 2
+        )
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """Регрессии относительно эталона: рост p50 сверх порога и
+    любой рост числа запросов."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p50_ms'] > previous['p50_ms'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p50 {previous["p50_ms"]} -> {current["p50_ms"]} мс'
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {previous["queries"]} -> '
+                f'{current["queries"]}'
+            )
+    return regressions
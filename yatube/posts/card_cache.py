@@ -0,0 +1,44 @@
+"""Кеш HTML карточек постов.
+
+Ключ карточки — id поста и хеш всего, что выводится в ней: текста,
+картинки и миниатюры, числа комментариев, имени автора и группы, а
+также варианта карточки (блок группы, кнопка подписки). Правка поста,
+смена картинки или переименование автора дают новый ключ, поэтому
+сбрасывать ничего не нужно: старые записи вытесняются по сроку жизни.
+
+Лента сначала забирает карточки всей страницы одним ``get_many``, а
+рендерит только недостающие.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def make_key(post, show_group=True, following=None):
+    """Ключ карточки; ``following`` — None, если кнопки подписки нет."""
+    author = post.author
+    group = post.group
+    parts = (
+        post.text,
+        post.image.name,
+        post.image_thumbnail,
+        post.pub_date.isoformat(),
+        post.comments_count,
+        author.username,
+        author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+        bool(show_group),
+        following,
+    )
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return 'card:%s:%s' % (post.pk, digest)
+
+
+def get_many(keys):
+    return cache.get_many(keys)
+
+
+def store(key, html):
+    cache.set(key, html, settings.CARD_CACHE_TIMEOUT)
@@ -0,0 +1,61 @@
+"""Данные карточек постов для ``{% post_card %}``.
+
+Ссылки карточек не разворачиваются через ``reverse()`` для каждого
+поста: ``RouteURL`` разворачивает маршрут один раз с меткой вместо
+аргумента, а для поста подставляет значение на место метки.
+"""
+from urllib.parse import quote
+
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+
+MARKER = '987654321'
+# Те же символы, что reverse() оставляет в пути без экранирования.
+SAFE = RFC3986_SUBDELIMS + '/~:@'
+
+
+class RouteURL:
+    """URL маршрута с одним аргументом, развёрнутый заранее."""
+
+    def __init__(self, viewname):
+        self.head, self.tail = reverse(viewname, args=[MARKER]).split(MARKER)
+
+    def __call__(self, value):
+        return self.head + quote(str(value), safe=SAFE) + self.tail
+
+
+class Routes:
+    """Маршруты карточки; создаются один раз на рендер страницы."""
+
+    def __init__(self):
+        self.profile = RouteURL('posts:profile')
+        self.detail = RouteURL('posts:post_detail')
+        self.group = RouteURL('posts:group_list')
+        self.follow = RouteURL('posts:profile_follow')
+        self.unfollow = RouteURL('posts:profile_unfollow')
+
+
+def following(post, follow_state=None):
+    """Подписан ли посетитель на автора; None, если кнопки нет."""
+    if follow_state is None or not follow_state.can_follow(post.author_id):
+        return None
+    return follow_state.is_following(post.author_id)
+
+
+def card(post, routes, follow_state=None):
+    """Ссылки карточки поста и состояние подписки на автора."""
+    username = post.author.username
+    state = following(post, follow_state)
+    follow_url = ''
+    if state is not None:
+        follow_url = (
+            routes.unfollow(username) if state else routes.follow(username)
+        )
+    return {
+        'profile_url': routes.profile(username),
+        'detail_url': routes.detail(post.pk),
+        'group_url': routes.group(post.group.slug) if post.group else '',
+        'follow_url': follow_url,
+        'following': bool(state),
+    }
@@ -0,0 +1,107 @@
+"""Валидаторы HTTP-кеша для лент и страницы поста.
+
+Функции вызываются декоратором ``condition`` до самого представления,
+поэтому не рендерят шаблонов и обходятся одним-двумя запросами по
+индексам. ETag строится из поколения ``feed_cache``, которое меняется
+при любой правке постов и комментариев, и того, что на странице
+зависит от посетителя. Last-Modified — время последней смены поколения
+или подписки посетителя и автора: дата публикации не сдвигается при
+правке поста, и клиент получил бы 304 на устаревшую страницу.
+"""
+import hashlib
+import math
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from core import replicas
+
+from . import feed_cache, follow_state, lookups
+from .models import Follow, Profile
+
+
+def _etag(request, *parts):
+    if replicas.current():
+        # Поколение общее, а реплика может отставать: ETag закрепил бы
+        # у клиента старую версию. Остаётся Last-Modified по реплике.
+        return None
+    user = request.user.pk if request.user.is_authenticated else 0
+    values = (feed_cache.get_generation(), user) + parts
+    return hashlib.md5(
+        ':'.join(str(value) for value in values).encode()
+    ).hexdigest()
+
+
+def _last_modified(request, *user_ids):
+    if request.user.is_authenticated:
+        user_ids += (request.user.pk,)
+    changed = feed_cache.changed_at()
+    if user_ids:
+        changed = max(changed, follow_state.changed_at(*user_ids))
+    # Last-Modified точен до секунды: пока секунда изменения не истекла,
+    # следующая правка получила бы то же время.
+    changed = math.ceil(changed)
+    now = time.time()
+    if changed > now:
+        return None
+    if replicas.current() and changed > now - settings.REPLICA_PIN_SECONDS:
+        # Реплика могла ещё не получить последнюю правку.
+        return None
+    return datetime.fromtimestamp(changed, timezone.utc)
+
+
+def index_etag(request):
+    # На ленте кнопки «Подписаться», поэтому учитывается и версия
+    # подписок посетителя.
+    return _etag(request, 'index', follow_state.version(request.user))
+
+
+def index_last_modified(request):
+    return _last_modified(request)
+
+
+def group_etag(request, slug):
+    return _etag(
+        request, 'group', slug, follow_state.version(request.user)
+    )
+
+
+def group_last_modified(request, slug):
+    group = lookups.get_group(slug)
+    if group is None:
+        return None
+    return _last_modified(request)
+
+
+def profile_etag(request, username):
+    # Подписки не меняют поколение лент, поэтому счётчики профиля
+    # и кнопка «Подписаться» учитываются отдельно.
+    author_id = lookups.get_author_id(username)
+    counts = (Profile.objects.filter(user_id=author_id)
+              .values_list('posts_count', 'followers_count',
+                           'following_count')
+              .first())
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author_id=author_id
+        ).exists()
+    )
+    return _etag(request, 'profile', username, counts, following)
+
+
+def profile_last_modified(request, username):
+    # Подписки на автора меняют его счётчики на странице профиля.
+    author_id = lookups.get_author_id(username)
+    if author_id is None:
+        return None
+    return _last_modified(request, author_id)
+
+
+def post_etag(request, post_id):
+    return _etag(request, 'post', post_id)
+
+
+def post_last_modified(request, post_id):
+    return _last_modified(request)
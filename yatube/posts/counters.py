@@ -0,0 +1,91 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` из сигналов
+моделей, а команда ``reconcile_counters`` пересчитывает их по данным,
+если они всё же разошлись (например, после ``bulk_create``).
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, Profile, User
+
+
+BATCH_SIZE = 500
+
+
+def _add(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{'%s__gte' % field: -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_profile(user_id, field, delta):
+    profiles = Profile.objects.filter(user_id=user_id)
+    if _add(profiles, field, delta) or delta < 0:
+        return
+    # Профиль мог не успеть появиться у пользователя, созданного в обход
+    # сигналов; при удалении его не создаём, чтобы не мешать каскаду.
+    if User.objects.filter(pk=user_id).exists():
+        Profile.objects.get_or_create(user_id=user_id)
+        _add(profiles, field, delta)
+
+
+def get_profile(user):
+    """Профиль пользователя; недостающий создаётся со счётчиками,
+    посчитанными по данным."""
+    profile, _ = Profile.objects.get_or_create(user=user, defaults={
+        'posts_count': user.posts.count(),
+        'followers_count': user.following.count(),
+        'following_count': user.follower.count(),
+    })
+    return profile
+
+
+def bump_profiles(user_ids, field, delta):
+    """Меняет счётчик сразу у нескольких профилей одним запросом."""
+    return _add(Profile.objects.filter(user_id__in=user_ids), field, delta)
+
+
+def bump_post(post_id, delta):
+    _add(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count_by(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile():
+    """Сверяет счётчики с данными и возвращает число исправленных строк."""
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(profile__isnull=True)
+            .values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    expected = {
+        Profile: {
+            'posts_count': _count_by(Post, 'author'),
+            'followers_count': _count_by(Follow, 'author'),
+            'following_count': _count_by(Follow, 'user'),
+        },
+        Post: {
+            'comments_count': _count_by(Comment, 'post'),
+        },
+    }
+    fixed = {}
+    for model, counters in expected.items():
+        for field, actual in counters.items():
+            drifted = (model.objects.annotate(actual=actual)
+                       .exclude(**{field: F('actual')})
+                       .values_list('pk', flat=True))
+            drifted = list(drifted)
+            for start in range(0, len(drifted), BATCH_SIZE):
+                batch = drifted[start:start + BATCH_SIZE]
+                model.objects.filter(pk__in=batch).update(**{field: actual})
+            fixed['%s.%s' % (model.__name__, field)] = len(drifted)
+    return fixed
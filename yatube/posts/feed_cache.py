@@ -0,0 +1,170 @@
+"""Версионированный кеш фрагментов лент.
+
+Ключ фрагмента включает тип ленты и страницу, а в значении хранится
+номер поколения, для которого фрагмент собран. Любое изменение постов
+или комментариев увеличивает поколение, поэтому фрагменты хранятся без
+срока жизни и устаревают ровно тогда, когда меняется содержимое.
+
+Устаревший фрагмент пересобирает только один процесс — тот, кто первым
+взял блокировку; остальные до этого момента отдают старую версию.
+
+Блокировка и счётчики опираются на атомарные ``add`` и ``incr``. Кеш
+в памяти процесса и memcached дают их сами, а у ``FileBasedCache``
+это чтение и запись отдельных файлов, поэтому для него они выполняются
+под ``flock`` на общем файле в каталоге кеша.
+"""
+import fcntl
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+from core import profiling
+
+
+GENERATION_KEY = 'feed:generation'
+CHANGED_KEY = 'feed:changed'
+HITS_KEY = 'feed:stats:hits'
+MISSES_KEY = 'feed:stats:misses'
+STALE_KEY = 'feed:stats:stale'
+LOCK_TIMEOUT = 30
+LOCK_FILE = 'feed.lock'
+
+
+@contextmanager
+def _exclusive():
+    """Для файлового кеша держит межпроцессную блокировку и отдаёт True;
+    для остальных бэкендов ничего не блокирует."""
+    backend = caches['default']
+    if not isinstance(backend, FileBasedCache):
+        yield False
+        return
+    os.makedirs(backend._dir, exist_ok=True)
+    with open(os.path.join(backend._dir, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield True
+
+
+def _add(key, value, timeout):
+    with _exclusive():
+        return cache.add(key, value, timeout)
+
+
+def _incr(key):
+    with _exclusive() as file_based:
+        if not file_based:
+            return cache.incr(key)
+        # FileBasedCache.incr — это get и set, а set ещё и ставит ключу
+        # срок жизни по умолчанию.
+        value = cache.get(key)
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        cache.set(key, value + 1, None)
+        return value + 1
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Новое поколение не должно совпасть с уже вытесненным счётчиком,
+        # иначе всплывут фрагменты, собранные до его потери.
+        _add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    cache.set(CHANGED_KEY, time.time(), None)
+    try:
+        _incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def changed_at():
+    """Время последней смены поколения, секунды от эпохи."""
+    changed = cache.get(CHANGED_KEY)
+    if changed is None:
+        # Время потеряно вместе с кешем: считаем, что ленты изменились
+        # только что, иначе клиент получил бы 304 на устаревшую копию.
+        _add(CHANGED_KEY, time.time(), None)
+        changed = cache.get(CHANGED_KEY)
+    return changed
+
+
+def page_key(page):
+    """Идентификатор страницы для ключа кеша."""
+    if getattr(page, 'is_cursor', False):
+        if not page:
+            return 'c:'
+        return 'c:' + page.paginator.cursor_for(page.rows[0])
+    return 'p:%s' % page.number
+
+
+def make_key(feed, vary_on):
+    digest = hashlib.md5(
+        ':'.join(str(value) for value in vary_on).encode()
+    ).hexdigest()
+    return 'feed:%s:%s' % (feed, digest)
+
+
+def _count(key, event):
+    profiling.count_cache(event)
+    _add(key, 0, None)
+    try:
+        _incr(key)
+    except ValueError:
+        pass
+
+
+def lock_key(key):
+    return key + ':lock'
+
+
+def get_or_render(key, render, timeout=None):
+    """Возвращает фрагмент из кеша или собирает его через ``render()``.
+
+    ``timeout`` ограничивает жизнь фрагмента; по умолчанию он живёт
+    до смены поколения.
+    """
+    generation = get_generation()
+    entry = cache.get(key)
+    locked = False
+    if entry is None or entry[0] != generation:
+        locked = _add(lock_key(key), 1, LOCK_TIMEOUT)
+    if locked:
+        # Фрагмент мог собрать тот, кто держал блокировку между нашим
+        # чтением и её захватом.
+        entry = cache.get(key)
+    if entry is not None and entry[0] == generation:
+        if locked:
+            cache.delete(lock_key(key))
+        _count(HITS_KEY, 'hits')
+        return entry[1]
+    if entry is not None and not locked:
+        _count(STALE_KEY, 'stale')
+        return entry[1]
+    _count(MISSES_KEY, 'misses')
+    try:
+        value = render()
+        cache.set(key, (generation, value), timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key(key))
+    return value
+
+
+def stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    stale = cache.get(STALE_KEY, 0)
+    total = hits + misses + stale
+    return {
+        'hits': hits,
+        'misses': misses,
+        'stale': stale,
+        'hit_rate': hits / total if total else 0.0,
+    }
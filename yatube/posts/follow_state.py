@@ -0,0 +1,128 @@
+"""Подписан ли посетитель на авторов постов страницы.
+
+``FollowState`` отвечает на вопрос для всей страницы ленты сразу: из
+кешированного множества подписок пользователя или одним запросом по
+авторам страницы. Множество кешируется только для тех, у кого подписок
+не больше ``settings.FOLLOW_STATE_CACHE_LIMIT``. Любая подписка или
+отписка сбрасывает множество и меняет версию пользователя, которая
+входит в ключи фрагментов лент и ETag, а время подписки запоминается
+для подписчика и автора ради Last-Modified.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from .models import Follow
+
+
+TOO_MANY = 'too-many'
+
+
+def _ids_key(user_id):
+    return 'follow:ids:%s' % user_id
+
+
+def _version_key(user_id):
+    return 'follow:version:%s' % user_id
+
+
+def _changed_key(user_id):
+    return 'follow:changed:%s' % user_id
+
+
+def followed_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь, или None,
+    если подписок слишком много для кеша."""
+    limit = settings.FOLLOW_STATE_CACHE_LIMIT
+    if not limit:
+        return None
+    ids = cache.get(_ids_key(user_id))
+    if ids is None:
+        ids = list(
+            Follow.objects.using('default').filter(user_id=user_id)
+            .values_list('author_id', flat=True)[:limit + 1]
+        )
+        ids = set(ids) if len(ids) <= limit else TOO_MANY
+        cache.set(_ids_key(user_id), ids, None)
+    return None if ids == TOO_MANY else ids
+
+
+def version(user):
+    """Версия подписок посетителя для ключей кеша; пустая для гостя."""
+    if not user.is_authenticated:
+        return ''
+    key = _version_key(user.pk)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        value = cache.get(key)
+    return '%s:%s' % (user.pk, value)
+
+
+def changed(*user_ids):
+    cache.delete_many([_ids_key(user_id) for user_id in user_ids])
+    cache.set_many(
+        {_version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+        None,
+    )
+    touch(*user_ids)
+
+
+def touch(*user_ids):
+    """Запоминает время подписки или отписки с участием пользователей."""
+    now = time.time()
+    cache.set_many(
+        {_changed_key(user_id): now for user_id in user_ids}, None
+    )
+
+
+def changed_at(*user_ids):
+    """Время последней подписки или отписки с участием пользователей."""
+    keys = [_changed_key(user_id) for user_id in user_ids]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Как и для поколения лент: потерянное время считается текущим.
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return max(found.values(), default=0)
+
+
+class FollowState:
+    """Подписки посетителя на авторов постов ``posts``.
+
+    Ничего не загружает, пока шаблон не спросит: если фрагмент ленты
+    взят из кеша, запросов не будет вовсе.
+    """
+
+    def __init__(self, user, posts):
+        self.user = user
+        self.posts = posts
+
+    @cached_property
+    def version(self):
+        return version(self.user)
+
+    @cached_property
+    def followed(self):
+        if not self.user.is_authenticated:
+            return set()
+        ids = followed_ids(self.user.pk)
+        if ids is not None:
+            return ids
+        authors = {post.author_id for post in self.posts}
+        return set(
+            Follow.objects.filter(user=self.user, author_id__in=authors)
+            .values_list('author_id', flat=True)
+        )
+
+    def can_follow(self, author_id):
+        return self.user.is_authenticated and author_id != self.user.pk
+
+    def is_following(self, author_id):
+        return author_id in self.followed
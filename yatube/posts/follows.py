@@ -0,0 +1,99 @@
+"""Пакетные подписки и отписки.
+
+Имена авторов разрешаются одним запросом, подписки пишутся одним
+``bulk_create``, отписки — одним ``DELETE``. Сигналы ``Follow`` при
+этом не срабатывают, поэтому счётчики профилей, лента подписок и
+кеш ``follow_state`` обновляются здесь же, тоже пакетно.
+
+Счётчики сдвигаются на число подписок, найденных до записи, поэтому
+пакеты одного пользователя должны идти по очереди. На SQLite это
+обеспечивает режим транзакций ``IMMEDIATE`` из настроек: транзакция
+сразу берёт блокировку базы на запись, а ``select_for_update`` там
+ничего не блокирует. На базах с блокировкой строк очередь держит
+``select_for_update`` профиля подписчика, который подписка с сайта
+тоже обновляет в своей транзакции.
+"""
+from django.db import connection, transaction
+
+from . import counters, follow_state, timeline
+from .models import Follow, Profile, User
+
+
+def resolve(user, usernames):
+    """Словарь ``username -> id`` найденных авторов, кроме самого себя."""
+    return dict(
+        User.objects.filter(username__in=set(usernames))
+        .exclude(pk=user.pk)
+        .values_list('username', 'pk')
+    )
+
+
+def _followed(user, author_ids):
+    return set(
+        Follow.objects.filter(user=user, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    )
+
+
+def _lock(user):
+    # Блокирует строку профиля там, где есть FOR UPDATE; на SQLite это
+    # обычный SELECT, а очередь держит транзакция IMMEDIATE.
+    list(
+        Profile.objects.select_for_update().filter(user_id=user.pk)
+        .values_list('pk', flat=True)
+    )
+
+
+def follow_many(user, author_ids):
+    """Подписывает на авторов и возвращает id новых подписок."""
+    if not author_ids:
+        return set()
+    with transaction.atomic():
+        _lock(user)
+        added = set(author_ids) - _followed(user, author_ids)
+        if not added:
+            return added
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id) for author_id in added],
+            ignore_conflicts=True,
+        )
+        counters.bump_profile(user.pk, 'following_count', len(added))
+        counters.bump_profiles(added, 'followers_count', 1)
+        timeline.add_authors(user.pk, added)
+        follow_state.changed(user.pk)
+        follow_state.touch(*added)
+    return added
+
+
+def _delete(user, author_ids):
+    # delete() загрузил бы строки и послал сигнал на каждую.
+    meta = Follow._meta
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM %s WHERE %s = %%s AND %s IN (%s)' % (
+                connection.ops.quote_name(meta.db_table),
+                connection.ops.quote_name(meta.get_field('user').column),
+                connection.ops.quote_name(meta.get_field('author').column),
+                placeholders,
+            ),
+            [user.pk, *author_ids],
+        )
+
+
+def unfollow_many(user, author_ids):
+    """Отписывает от авторов и возвращает id снятых подписок."""
+    if not author_ids:
+        return set()
+    with transaction.atomic():
+        _lock(user)
+        removed = _followed(user, author_ids)
+        if not removed:
+            return removed
+        _delete(user, removed)
+        counters.bump_profile(user.pk, 'following_count', -len(removed))
+        counters.bump_profiles(removed, 'followers_count', -1)
+        timeline.remove_authors(user.pk, removed)
+        follow_state.changed(user.pk)
+        follow_state.touch(*removed)
+    return removed
@@ -1,14 +1,69 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+
 from .models import Comment, Post
 
 
+ALLOWED_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected_image = None
+        image = self.files.get('image')
+        if getattr(image, 'rejected', False):
+            # Обрезанный файл не отдаём полю, чтобы не получить
+            # невнятное «загрузите правильное изображение».
+            self.files = self.files.copy()
+            self.files.pop('image')
+            self.rejected_image = image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.rejected_image is not None:
+            self.add_error('image', self._too_large())
+        return cleaned_data
+
+    def _too_large(self):
+        return 'Картинка больше %s.' % filesizeformat(
+            settings.POST_IMAGE_MAX_SIZE
+        )
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Pillow к этому моменту прочитал только заголовок файла.
+        header = getattr(image, 'image', None)
+        if header is None:
+            return image
+        if image.size > settings.POST_IMAGE_MAX_SIZE:
+            raise forms.ValidationError(self._too_large())
+        if header.format not in ALLOWED_IMAGE_FORMATS:
+            raise forms.ValidationError(
+                'Поддерживаются форматы: %s.' % ', '.join(
+                    ALLOWED_IMAGE_FORMATS
+                )
+            )
+        width, height = header.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Картинка %sx%s слишком велика.' % (width, height)
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.SlugField(label='Сообщество', required=False)
+    author = forms.CharField(label='Автор', max_length=150, required=False)
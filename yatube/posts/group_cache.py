@@ -0,0 +1,114 @@
+"""Кеш первых страниц лент групп.
+
+Для группы хранятся число её постов и id ``HOT_POSTS`` самых свежих,
+так что первые страницы ленты собираются одним запросом по первичному
+ключу без ``COUNT(*)`` и сортировки. Новый пост дописывается в начало
+списка, а перенос или удаление поста, как и правка группы, сбрасывает
+запись — следующий запрос соберёт её заново. Записи всегда строятся
+по основной базе, чтобы не закрепить в кеше отставшую реплику.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from . import lookups
+from .models import Group, Post
+
+
+# Первые пять страниц по десять постов.
+HOT_POSTS = 50
+LOCK_TIMEOUT = 10
+
+
+def _hot_key(group_id):
+    return 'group:hot:%s' % group_id
+
+
+def _load(group_id):
+    posts = Post.objects.using('default').filter(group_id=group_id)
+    entry = {
+        'count': posts.count(),
+        'ids': list(
+            posts.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)[:HOT_POSTS]
+        ),
+    }
+    cache.set(_hot_key(group_id), entry, None)
+    return entry
+
+
+def get_hot(group_id):
+    """Число постов группы и id самых свежих из них."""
+    entry = cache.get(_hot_key(group_id))
+    if entry is None:
+        entry = _load(group_id)
+    return entry
+
+
+def add_post(group_id, post_id):
+    """Дописывает новый пост в начало списка группы."""
+    key = _hot_key(group_id)
+    lock = key + ':lock'
+    if not cache.add(lock, 1, LOCK_TIMEOUT):
+        # Список меняет другой процесс: проще собрать его заново.
+        cache.delete(key)
+        return
+    try:
+        entry = cache.get(key)
+        if entry is not None:
+            entry['count'] += 1
+            entry['ids'] = [post_id] + entry['ids'][:HOT_POSTS - 1]
+            cache.set(key, entry, None)
+    finally:
+        cache.delete(lock)
+
+
+def invalidate(*group_ids):
+    cache.delete_many([
+        _hot_key(group_id) for group_id in group_ids if group_id
+    ])
+
+
+def clear():
+    """Сбрасывает записи всех групп, например после ``bulk_create``."""
+    invalidate(*Group.objects.values_list('pk', flat=True))
+
+
+def warm(top=10):
+    """Заполняет кеш для ``top`` групп с наибольшим числом постов."""
+    groups = list(
+        Group.objects.using('default')
+        .annotate(post_count=Count('posts'))
+        .order_by('-post_count', 'pk')[:top]
+    )
+    for group in groups:
+        lookups.remember_group(group)
+        _load(group.pk)
+    return len(groups)
+
+
+class HotPosts:
+    """Посты ленты группы для ``Paginator``.
+
+    Срезы в пределах закешированного списка загружаются по id, более
+    глубокие страницы читаются из ``queryset`` как обычно.
+    """
+
+    def __init__(self, group_id, queryset):
+        self.queryset = queryset
+        entry = get_hot(group_id)
+        self.ids = entry['ids']
+        self._count = entry['count']
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if (isinstance(index, slice) and index.stop is not None
+                and index.stop <= len(self.ids)):
+            ids = self.ids[index]
+            posts = self.queryset.in_bulk(ids)
+            return [posts[pk] for pk in ids if pk in posts]
+        return self.queryset[index]
@@ -0,0 +1,69 @@
+"""Поиск автора по username и группы по slug через ``core.lru``.
+
+В кеше лежат только поля строки, а не сами объекты: каждый вызов
+собирает свежий экземпляр, так что запросы не делят общий объект.
+У автора кешируются поля для ссылок и подписи; остальные, как и
+счётчики профиля, догружаются из базы при обращении. Записи строятся
+по основной базе, чтобы не закрепить в кеше отставшую реплику.
+"""
+from django.conf import settings
+
+from core.lru import LRUCache
+
+from .models import Group, User
+
+
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+
+authors = LRUCache(
+    'author', settings.LOOKUP_CACHE_SIZE, settings.LOOKUP_CACHE_TIMEOUT
+)
+groups = LRUCache(
+    'group', settings.LOOKUP_CACHE_SIZE, settings.LOOKUP_CACHE_TIMEOUT
+)
+
+
+def _row(queryset, fields):
+    return queryset.using('default').values_list(*fields).first()
+
+
+def _build(model, fields, row):
+    if row is None:
+        return None
+    return model.from_db('default', fields, row)
+
+
+def get_author(username):
+    """Автор по username или None."""
+    row = authors.get(username, lambda username: _row(
+        User.objects.filter(username=username), AUTHOR_FIELDS
+    ))
+    return _build(User, AUTHOR_FIELDS, row)
+
+
+def get_author_id(username):
+    author = get_author(username)
+    return author.pk if author is not None else None
+
+
+def get_group(slug):
+    """Группа по slug или None."""
+    row = groups.get(slug, lambda slug: _row(
+        Group.objects.filter(slug=slug), GROUP_FIELDS
+    ))
+    return _build(Group, GROUP_FIELDS, row)
+
+
+def remember_group(group):
+    groups.set(group.slug, tuple(
+        getattr(group, field) for field in GROUP_FIELDS
+    ))
+
+
+def invalidate_author(*usernames):
+    authors.delete(*usernames)
+
+
+def invalidate_group(*slugs):
+    groups.delete(*slugs)
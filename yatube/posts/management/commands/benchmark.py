@@ -0,0 +1,100 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Наполняет временную базу и меряет задержку, запросы и '
+            'память для каждого маршрута posts.urls.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--render', action='store_true',
+            help='Сравнить рендер карточек через include и post_card.'
+        )
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p50 относительно эталона.'
+        )
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        # Замеры идут во временной базе, рабочие данные не трогаем.
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            benchmark.seed(seed_value=options['seed'], **volumes)
+            results = benchmark.run(
+                requests=options['requests'],
+                warmup=options['warmup'],
+                cold=options['cold'],
+            )
+            render = None
+            if options['render']:
+                render = benchmark.render_cards(repeat=options['requests'])
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+        report = {
+            'volumes': volumes,
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'results': results,
+        }
+        if render is not None:
+            report['render'] = render
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20} {result["status"]} '
+                f'p50={result["p50_ms"]:.1f} p90={result["p90_ms"]:.1f} '
+                f'p99={result["p99_ms"]:.1f} мс, '
+                f'запросов={result["queries"]}, '
+                f'память={result["alloc_peak_kb"]} КиБ'
+            )
+        if render is not None:
+            self.stdout.write(
+                f'Рендер страницы: include '
+                f'p50={render["include"]["p50_ms"]:.2f} мс'
+            )
+            for name in ('post_card', 'post_card_cached'):
+                self.stdout.write(
+                    f'{name:<20} p50={render[name]["p50_ms"]:.2f} мс, '
+                    f'быстрее в {render[name]["speedup"]} раза'
+                )
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                json.dump(report, target, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as source:
+                baseline = json.load(source)['results']
+            regressions = benchmark.compare(
+                results, baseline, options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('Регрессий нет.')
@@ -0,0 +1,38 @@
+import sys
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в NDJSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или «-» для stdout.')
+        parser.add_argument(
+            '--media', help='Каталог, куда скопировать картинки постов.'
+        )
+
+    def handle(self, path, media, **options):
+        target = sys.stdout if path == '-' else open(
+            path, 'w', encoding='utf-8'
+        )
+        written = missing = 0
+        try:
+            for record in transfer.export_records():
+                target.write(transfer.dump(record) + '\n')
+                written += 1
+                if media and record['model'] == 'post' and record['image']:
+                    if not transfer.copy_media(
+                        record['image'], default_storage, media
+                    ):
+                        missing += 1
+        finally:
+            if target is not sys.stdout:
+                target.close()
+        self.stderr.write(f'Выгружено записей: {written}')
+        if missing:
+            self.stderr.write(f'Не найдено картинок: {missing}')
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts. Прерванный импорт '
+            'продолжается с последней сохранённой пачки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки в NDJSON.')
+        parser.add_argument(
+            '--media', help='Каталог с картинками из выгрузки.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не глядя на сохранённый прогресс.'
+        )
+
+    def handle(self, path, media, batch_size, restart, **options):
+        self.progress_path = path + '.progress'
+        self.state = None if restart else self.load_progress()
+        if self.state is None:
+            self.state = {
+                'line': 0,
+                'offsets': transfer.initial_offsets(
+                    transfer.id_spans(self.records(path))
+                ),
+            }
+        elif self.state['line']:
+            self.stderr.write(f'Продолжаем со строки {self.state["line"]}')
+        self.media = media
+        self.missing = 0
+        self.imported = 0
+        self.started = time.monotonic()
+        name, batch = None, []
+        line = self.state['line']
+        with open(path, encoding='utf-8') as source:
+            for line, text in enumerate(source, 1):
+                if line <= self.state['line'] or not text.strip():
+                    continue
+                record = json.loads(text)
+                if batch and (record['model'] != name
+                              or len(batch) >= batch_size):
+                    self.flush(name, batch, line - 1)
+                    batch = []
+                name = record['model']
+                batch.append(record)
+        if batch:
+            self.flush(name, batch, line)
+        self.finish()
+
+    def records(self, path):
+        with open(path, encoding='utf-8') as source:
+            for text in source:
+                if text.strip():
+                    yield json.loads(text)
+
+    def load_progress(self):
+        if not os.path.exists(self.progress_path):
+            return None
+        with open(self.progress_path) as source:
+            return json.load(source)
+
+    def save_progress(self):
+        temporary = self.progress_path + '.tmp'
+        with open(temporary, 'w') as target:
+            json.dump(self.state, target)
+        os.replace(temporary, self.progress_path)
+
+    def flush(self, name, batch, line):
+        if self.media and name == 'post':
+            for record in batch:
+                if record['image'] and not transfer.restore_media(
+                    record['image'], self.media
+                ):
+                    self.missing += 1
+        self.imported += transfer.import_batch(
+            name, batch, self.state['offsets']
+        )
+        self.state['line'] = line
+        self.save_progress()
+        elapsed = time.monotonic() - self.started
+        self.stderr.write(
+            f'{name}: строка {line}, сохранено {self.imported} '
+            f'({self.imported / max(elapsed, 1e-6):.0f} зап/с)'
+        )
+
+    def finish(self):
+        transfer.rebuild_derived()
+        call_command('generate_thumbnails', stdout=self.stderr)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        if self.missing:
+            self.stderr.write(f'Не найдено картинок: {self.missing}')
+        self.stdout.write(f'Импортировано записей: {self.imported}')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс по всем постам.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Проиндексировано постов: {search.rebuild()}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import group_cache
+
+
+class Command(BaseCommand):
+    help = 'Заполняет кеш самых больших групп, например после деплоя.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Сколько групп с наибольшим числом постов прогреть.'
+        )
+
+    def handle(self, *args, **options):
+        warmed = group_cache.warm(options['top'])
+        self.stdout.write(f'Прогрето групп: {warmed}')
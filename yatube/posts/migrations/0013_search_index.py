@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:39
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_search_index(apps, schema_editor):
+    from posts.search import tokenize
+
+    Post = apps.get_model('posts', 'Post')
+    SearchPosting = apps.get_model('posts', 'SearchPosting')
+    for post in Post.objects.only('pk', 'text').iterator():
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, post_id=post.pk, weight=min(count, 32767))
+            for term, count in Counter(tokenize(post.text)).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='search_unique_term_post'),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
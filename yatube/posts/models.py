@@ -15,6 +15,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент вместе с автором и группой одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -41,10 +47,30 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    image_thumbnail = models.CharField(
+        max_length=255, blank=True, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    DERIVED_FIELDS = ('comments_count', 'image_thumbnail')
 
     def get_absolute_url(self):
         return reverse('posts:post_detail', args={self.id})
 
+    def save(self, *args, **kwargs):
+        # Счётчик и миниатюру меняют только точечные UPDATE из сигналов
+        # и фонового воркера, поэтому обычное сохранение их не трогает.
+        if not (self._state.adding or kwargs.get('update_fields')
+                or kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.text[:15]
 
@@ -52,6 +78,15 @@ class Post(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(fields=('-pub_date',), name='post_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date'), name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'), name='post_author_date_idx'
+            ),
+        )
 
 
 class Comment(models.Model):
@@ -71,6 +106,13 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('post', 'created'), name='comment_post_created_idx'
+            ),
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -83,3 +125,81 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='follow_unique_user_author'
+            ),
+        )
+
+
+class Profile(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='profile',
+        on_delete=models.CASCADE
+    )
+    fan_out_on_read = models.BooleanField(
+        default=False,
+        help_text='Посты автора не раскладываются по лентам подписчиков, '
+                  'а подмешиваются в ленту при чтении'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date'), name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='timeline_unique_user_post'
+            ),
+        )
+
+
+class SearchPosting(models.Model):
+    """Запись инвертированного индекса: слово и пост, где оно встречается."""
+
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        related_name='search_postings',
+        on_delete=models.CASCADE
+    )
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'), name='search_unique_term_post'
+            ),
+        )
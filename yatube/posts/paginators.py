@@ -0,0 +1,235 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+DEFAULT_ORDERING = ('-pub_date', '-pk')
+
+
+def encode_cursor(values, inclusive=False):
+    """Упаковывает значения ключа сортировки в непрозрачный токен.
+
+    ``inclusive`` — страница по токену включает и саму запись с этим
+    ключом.
+    """
+    values = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    payload = {'key': values, 'inclusive': True} if inclusive else values
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _unpack(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return json.loads(raw.decode())
+    except (ValueError, TypeError):
+        return None
+
+
+def decode_cursor(token, size):
+    """Распаковывает токен; для битого токена возвращает None."""
+    values = _unpack(token)
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def decode_seek(token, size):
+    """Распаковывает токен курсора в пару ``(значения, inclusive)``;
+    для битого токена значения — None."""
+    payload = _unpack(token)
+    inclusive = isinstance(payload, dict) and payload.get('inclusive') is True
+    values = payload.get('key') if inclusive else payload
+    if not isinstance(values, list) or len(values) != size:
+        return None, False
+    return values, inclusive
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому число записей передано готовым.
+
+    Используется там, где количество уже хранится в счётчике,
+    чтобы не выполнять ``COUNT(*)`` на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса ``django.core.paginator.Page``,
+    которой пользуются шаблоны, но не знает ни номера страницы,
+    ни общего количества записей.
+    """
+
+    is_cursor = True
+
+    def __init__(self, rows, paginator, has_next, has_previous,
+                 anchor=None):
+        self.rows = rows
+        # Ключ, после которого начинается страница: пустой странице
+        # больше не от чего строить ссылку назад.
+        self.anchor = anchor
+        self.object_list = rows
+        if paginator.transform is not None:
+            self.object_list = paginator.transform(rows)
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<CursorPage of %s items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(self.rows[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        if not self.rows:
+            # Назад — страница, которая заканчивается самой записью
+            # с этим ключом.
+            return encode_cursor(self.anchor, inclusive=True)
+        return self.paginator.cursor_for(self.rows[0])
+
+
+class CursorPaginator:
+    """Пагинация по ключу сортировки (keyset) вместо OFFSET.
+
+    Страница выбирается условием на ``(pub_date, id)`` последней
+    показанной записи, поэтому глубокие страницы стоят столько же,
+    сколько первая, а ``COUNT(*)`` не выполняется вовсе.
+    """
+
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING,
+                 count=None, transform=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self._count = count
+        # Превращает строки страницы в то, что увидит шаблон, например
+        # строки values() с рангом — в объекты постов.
+        self.transform = transform
+
+    @cached_property
+    def count(self):
+        """Общее число записей; считается только по требованию шаблона."""
+        if self._count is not None:
+            return self._count
+        return self.object_list.count()
+
+    def _fields(self):
+        return [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def cursor_for(self, obj):
+        values = []
+        for name, _ in self._fields():
+            if isinstance(obj, dict):
+                values.append(obj['id'] if name == 'pk' else obj[name])
+            else:
+                values.append(getattr(obj, name))
+        return encode_cursor(values)
+
+    def _seek(self, values, forward, inclusive=False):
+        """Условие «после ключа» в направлении сортировки: строго или,
+        с ``inclusive``, вместе с самим ключом."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        if inclusive:
+            condition |= Q(**equal)
+        return condition
+
+    def page(self, after=None, before=None):
+        size = len(self.ordering)
+        after_values, after_inclusive = decode_seek(after, size)
+        before_values, before_inclusive = decode_seek(before, size)
+        queryset = self.object_list
+        if before_values is not None and after_values is None:
+            reverse = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in self.ordering
+            ]
+            queryset = (
+                queryset.filter(
+                    self._seek(before_values, False, before_inclusive)
+                ).order_by(*reverse)
+            )
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, self, bool(rows), has_previous)
+        queryset = queryset.order_by(*self.ordering)
+        if after_values is not None:
+            queryset = queryset.filter(
+                self._seek(after_values, True, after_inclusive)
+            )
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self, has_next, after_values is not None,
+            anchor=after_values,
+        )
+
+
+def paginate(request, object_list, per_page, count=None):
+    """Возвращает страницу ленты в режиме из ``settings.FEED_PAGINATION``.
+
+    ``count`` — заранее известное число записей, например из счётчика.
+    """
+    if settings.FEED_PAGINATION == 'cursor':
+        return CursorPaginator(object_list, per_page, count=count).page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    if count is not None:
+        paginator = CountedPaginator(object_list, per_page, count)
+    else:
+        paginator = Paginator(object_list, per_page)
+    return paginator.get_page(request.GET.get('page'))
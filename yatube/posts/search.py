@@ -0,0 +1,128 @@
+"""Полнотекстовый поиск по постам на инвертированном индексе.
+
+Для каждого поста хранится список его слов с частотой (``weight``).
+Запрос находит посты, где есть все слова запроса, и ранжирует их по
+сумме tf·idf. idf зависит от числа постов и меняется с каждым новым
+постом, поэтому выдача листается с теми idf, что были у первой
+страницы: иначе ранги сдвигаются и курсор пропускает или повторяет
+посты. Индекс обновляется при сохранении поста, удаляется
+каскадом вместе с ним и целиком пересобирается командой
+``rebuild_search_index``.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db.models import (
+    Case, Count, F, IntegerField, Sum, Value, When
+)
+
+from .models import Post, SearchPosting
+from .paginators import decode_cursor, encode_cursor
+
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MIN_TERM_LENGTH = 2
+BATCH_SIZE = 500
+# idf хранится целым числом, чтобы курсор по рангу сравнивался точно.
+IDF_SCALE = 1000
+
+
+def tokenize(text):
+    text = text.lower().replace('ё', 'е')
+    return [
+        term[:MAX_TERM_LENGTH] for term in TERM_RE.findall(text)
+        if len(term) >= MIN_TERM_LENGTH
+    ]
+
+
+def _postings(post):
+    return [
+        SearchPosting(term=term, post_id=post.pk, weight=min(count, 32767))
+        for term, count in Counter(tokenize(post.text)).items()
+    ]
+
+
+def index_post(post):
+    SearchPosting.objects.filter(post_id=post.pk).delete()
+    SearchPosting.objects.bulk_create(_postings(post), batch_size=BATCH_SIZE)
+
+
+def rebuild():
+    """Пересобирает индекс по всем постам; возвращает их число."""
+    SearchPosting.objects.all().delete()
+    batch = []
+    total = 0
+    for post in Post.objects.only('pk', 'text').iterator():
+        batch.extend(_postings(post))
+        total += 1
+        if len(batch) >= BATCH_SIZE:
+            SearchPosting.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            batch = []
+    SearchPosting.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+    return total
+
+
+def _idf(terms):
+    documents = Post.objects.count() or 1
+    frequency = dict(
+        SearchPosting.objects.filter(term__in=terms)
+        .values_list('term').annotate(Count('pk'))
+    )
+    return {
+        term: int(IDF_SCALE * math.log(1 + documents / frequency[term]))
+        for term in terms if term in frequency
+    }
+
+
+def weights(query, token=None):
+    """idf слов запроса: из ``token`` страницы выдачи или из индекса."""
+    terms = sorted(set(tokenize(query)))
+    values = decode_cursor(token, len(terms))
+    if values and all(
+        isinstance(value, int) and value >= 0 for value in values
+    ):
+        return dict(zip(terms, values))
+    return _idf(terms)
+
+
+def weights_token(idf):
+    """Токен с ``idf`` для ссылок на следующие страницы выдачи."""
+    return encode_cursor([idf[term] for term in sorted(idf)])
+
+
+def ranked(query, group=None, author=None, idf=None):
+    """Посты, содержащие все слова запроса, с рангом ``score``.
+
+    Возвращает values-queryset из словарей ``{'post_id': id, 'score': n}``,
+    упорядоченный по убыванию ранга. ``idf`` по умолчанию берётся
+    из индекса.
+    """
+    terms = sorted(set(tokenize(query)))
+    if idf is None:
+        idf = _idf(terms)
+    if not terms or len(idf) < len(terms):
+        return SearchPosting.objects.none().values('post_id').annotate(
+            score=Value(0, output_field=IntegerField())
+        )
+    postings = SearchPosting.objects.filter(term__in=terms)
+    if group:
+        postings = postings.filter(post__group__slug=group)
+    if author:
+        postings = postings.filter(post__author__username=author)
+    score = Sum(Case(
+        *[When(term=term, then=F('weight') * idf[term]) for term in terms],
+        output_field=IntegerField(),
+    ))
+    return (postings.order_by().values('post_id')
+            .annotate(score=score, matched=Count('pk'))
+            .filter(matched=len(terms))
+            .order_by('-score', '-post_id'))
+
+
+def posts_for(rows):
+    """Загружает посты для строк ``ranked()``, сохраняя порядок."""
+    ids = [row['post_id'] for row in rows]
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
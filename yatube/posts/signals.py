@@ -0,0 +1,124 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    counters, feed_cache, follow_state, group_cache, lookups, search,
+    thumbnails, timeline
+)
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    instance._old_username = None
+    if instance.pk and update_fields != frozenset(['last_login']):
+        instance._old_username = (
+            User.objects.filter(pk=instance.pk)
+            .values_list('username', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+    # Вход обновляет только last_login, которого в кеше нет.
+    if update_fields != frozenset(['last_login']):
+        lookups.invalidate_author(
+            instance.username, getattr(instance, '_old_username', None)
+        )
+        if not created:
+            # Имя автора выводится в карточках постов.
+            feed_cache.bump_generation()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    lookups.invalidate_author(instance.username)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    # Старый slug нужен, чтобы сбросить кеш группы при переименовании.
+    instance._old_slug = None
+    if instance.pk:
+        instance._old_slug = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list('slug', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    lookups.invalidate_group(
+        instance.slug, getattr(instance, '_old_slug', None)
+    )
+    group_cache.invalidate(instance.pk)
+    feed_cache.bump_generation()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._old_group_id = instance._old_image = None
+    if not instance._state.adding:
+        instance._old_group_id, instance._old_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+        if instance.group_id:
+            group_cache.add_post(instance.group_id, instance.pk)
+    elif instance._old_group_id != instance.group_id:
+        group_cache.invalidate(instance._old_group_id, instance.group_id)
+    # Миниатюры строятся при любом сохранении новой картинки: из формы,
+    # админки или кода.
+    if (instance.image.name or '') != (instance._old_image or ''):
+        thumbnails.schedule(instance)
+    search.index_post(instance)
+    feed_cache.bump_generation()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.author_id, 'posts_count', -1)
+    group_cache.invalidate(instance.group_id)
+    feed_cache.bump_generation()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+    feed_cache.bump_generation()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    feed_cache.bump_generation()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, 'followers_count', 1)
+        counters.bump_profile(instance.user_id, 'following_count', 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+        follow_state.changed(instance.user_id)
+        follow_state.touch(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.author_id, 'followers_count', -1)
+    counters.bump_profile(instance.user_id, 'following_count', -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    follow_state.changed(instance.user_id)
+    follow_state.touch(instance.author_id)
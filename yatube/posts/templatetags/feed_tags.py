@@ -0,0 +1,180 @@
+from django import template
+from django.conf import settings
+from django.template.base import token_kwargs
+
+from core import replicas
+
+from .. import card_cache, cards, feed_cache
+
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, feed, page, vary_on):
+        self.nodelist = nodelist
+        self.feed = feed
+        self.page = page
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [feed_cache.page_key(self.page.resolve(context))]
+        vary_on += [var.resolve(context) for var in self.vary_on]
+        timeout = None
+        replica = replicas.current()
+        if replica:
+            # Реплика может отставать: её фрагменты храним отдельно
+            # и недолго, чтобы не закрепить в кеше старую версию.
+            vary_on.append(replica)
+            timeout = settings.REPLICA_PIN_SECONDS
+        key = feed_cache.make_key(self.feed.resolve(context), vary_on)
+        return feed_cache.get_or_render(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag('feed_cache')
+def do_feed_cache(parser, token):
+    """
+    Кеширует фрагмент ленты до следующего изменения постов.
+
+    Пока один процесс пересобирает устаревший фрагмент, остальные
+    отдают предыдущую версию.
+
+    Использование::
+
+        {% load feed_tags %}
+        {% feed_cache 'index' page_obj [var1] [var2] ... %}
+            .. лента ..
+        {% endfeed_cache %}
+    """
+    nodelist = parser.parse(('endfeed_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            "'%r' tag requires at least 2 arguments." % tokens[0]
+        )
+    return FeedCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        parser.compile_filter(tokens[2]),
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
+
+
+@register.inclusion_tag('includes/follow_button.html', takes_context=True)
+def follow_button(context, author):
+    """
+    Кнопка подписки на автора поста в ленте.
+
+    Состояние берётся из ``follow_state`` контекста, которое разом
+    загружает подписки на всех авторов страницы. Без него, для гостя
+    и для собственных постов кнопка не выводится.
+
+    Использование::
+
+        {% follow_button post.author %}
+    """
+    state = context.get('follow_state')
+    if state is None or not state.can_follow(author.pk):
+        return {'show': False}
+    return {
+        'show': True,
+        'author': author,
+        'following': state.is_following(author.pk),
+    }
+
+
+class PostCardNode(template.Node):
+    template_name = 'includes/post_card.html'
+
+    def __init__(self, post, page, show_group):
+        self.post = post
+        self.page = page
+        self.show_group = show_group
+
+    def _state(self, context, show_group, follow_state):
+        # Маршруты и шаблон карточки готовятся один раз на рендер
+        # страницы, а не для каждого поста, как при {% include %};
+        # там же лежат карточки страницы, взятые из кеша.
+        state = context.render_context.get(self)
+        if state is None:
+            state = context.render_context[self] = {
+                'routes': cards.Routes(),
+                'template': context.template.engine.get_template(
+                    self.template_name
+                ),
+                'cached': {},
+            }
+            if self.page is not None:
+                state['cached'] = card_cache.get_many([
+                    card_cache.make_key(
+                        post, show_group, cards.following(post, follow_state)
+                    )
+                    for post in self.page.resolve(context)
+                ])
+        return state
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        show_group = self.show_group.resolve(context)
+        follow_state = context.get('follow_state')
+        state = self._state(context, show_group, follow_state)
+        key = card_cache.make_key(
+            post, show_group, cards.following(post, follow_state)
+        )
+        if self.page is None:
+            state['cached'] = card_cache.get_many([key])
+        html = state['cached'].get(key)
+        if html is not None:
+            return html
+        values = {
+            'post': post,
+            'card': cards.card(post, state['routes'], follow_state),
+            'show_group': show_group,
+        }
+        with context.push(**values):
+            html = state['template'].render(context)
+        card_cache.store(key, html)
+        return html
+
+
+@register.tag('post_card')
+def do_post_card(parser, token):
+    """
+    Карточка поста в ленте, кешируемая по версии поста.
+
+    Замена ``{% include 'includes/article.html' %}`` в цикле: шаблон
+    карточки загружается, а ссылки разворачиваются один раз на страницу.
+    С ``from page_obj`` карточки всей страницы читаются из кеша одним
+    запросом при первой из них, а рендерятся только недостающие.
+    Кнопка подписки выводится, если в контексте есть ``follow_state``.
+
+    Использование::
+
+        {% load feed_tags %}
+        {% for post in page_obj %}
+            {% post_card post [from page_obj] [show_group=False] %}
+        {% endfor %}
+    """
+    tag_name, *bits = token.split_contents()
+    if not bits:
+        raise template.TemplateSyntaxError(
+            "'%s' tag requires a post argument." % tag_name
+        )
+    post = parser.compile_filter(bits[0])
+    bits = bits[1:]
+    page = None
+    if len(bits) >= 2 and bits[0] == 'from':
+        page = parser.compile_filter(bits[1])
+        bits = bits[2:]
+    # token_kwargs забирает из списка разобранные аргументы.
+    options = token_kwargs(bits, parser)
+    if bits or set(options) - {'show_group'}:
+        raise template.TemplateSyntaxError(
+            "'%s' tag accepts only 'from' and show_group." % tag_name
+        )
+    return PostCardNode(
+        post, page, options.get('show_group', parser.compile_filter('True'))
+    )
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Post
+from ..urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+    def test_run_covers_every_route(self):
+        """Прогон меряет каждый маршрут posts.urls."""
+        benchmark.seed(users=5, groups=2, posts=30, comments=40, follows=10)
+        self.assertEqual(Post.objects.count(), 30)
+        results = benchmark.run(requests=2, warmup=0)
+        self.assertEqual(
+            set(results), {pattern.name for pattern in urlpatterns}
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 400)
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['alloc_peak_kb'], 0)
+
+    def test_compare_with_baseline(self):
+        """Сравнение с эталоном находит рост задержки и запросов."""
+        baseline = {'index': {'p50_ms': 10.0, 'queries': 4}}
+        self.assertEqual(
+            benchmark.compare(
+                {'index': {'p50_ms': 11.0, 'queries': 4}}, baseline
+            ),
+            []
+        )
+        self.assertEqual(
+            len(benchmark.compare(
+                {'index': {'p50_ms': 13.0, 'queries': 5}}, baseline
+            )),
+            2
+        )
+
+    def test_render_cards(self):
+        """Микробенчмарк рендера сравнивает include и post_card."""
+        benchmark.seed(users=3, groups=1, posts=10, comments=0, follows=0)
+        results = benchmark.render_cards(posts=10, repeat=3)
+        self.assertGreater(results['include']['p50_ms'], 0)
+        for name in ('post_card', 'post_card_cached'):
+            with self.subTest(name=name):
+                self.assertGreater(results[name]['p50_ms'], 0)
+                self.assertGreater(results[name]['speedup'], 0)
@@ -1,12 +1,67 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from .. import feed_cache
 from ..models import Group, Post
 
 
 User = get_user_model()
+WORKERS = 8
+BUMPS = 50
+
+
+def _in_workers(target, *args):
+    """Запускает ``target`` в WORKERS процессах разом и собирает
+    результаты."""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    workers = [
+        context.Process(target=target, args=(barrier, results) + args)
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    values = [results.get(timeout=30) for _ in workers]
+    for worker in workers:
+        worker.join()
+    return values
+
+
+def _bump(barrier, results):
+    barrier.wait()
+    for _ in range(BUMPS):
+        feed_cache.bump_generation()
+    results.put(None)
+
+
+def _lock(barrier, results):
+    rendered = []
+    barrier.wait()
+    for number in range(BUMPS):
+        feed_cache.get_or_render(
+            f'feed:test:{number}', lambda: rendered.append(number)
+        )
+    results.put([number in rendered for number in range(BUMPS)])
+
+
+def _render(barrier, results, key, log):
+    def render():
+        with open(log, 'a') as file:
+            file.write('render\n')
+        time.sleep(0.2)
+        return 'new'
+
+    barrier.wait()
+    results.put(feed_cache.get_or_render(key, render))
 
 
 class PostViewTests(TestCase):
@@ -20,7 +75,11 @@ class PostViewTests(TestCase):
             description='Тестовое описание',
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_index_cache(self):
+        """Главная отдаётся из кеша, пока посты не меняются."""
         cache_post = Post.objects.create(
             author=self.user,
             group=self.group,
@@ -28,11 +87,111 @@ class PostViewTests(TestCase):
         )
         response = self.client.get(reverse('posts:index'))
         cache1 = response.content
-        cache_post.delete()
+        Post.objects.filter(pk=cache_post.pk).update(text='Без сигнала')
         response2 = self.client.get(reverse('posts:index'))
         cache2 = response2.content
         self.assertTrue(cache1 == cache2)
-        cache.clear()
+        self.assertEqual(feed_cache.stats()['hits'], 1)
+        cache_post.delete()
         response3 = self.client.get(reverse('posts:index'))
         cache3 = response3.content
         self.assertTrue(cache1 != cache3)
+        self.assertNotIn('Тестовый пост', cache3.decode())
+
+    def test_index_cache_per_page(self):
+        """Каждая страница главной кешируется отдельно."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Тестовый пост {i}')
+            for i in range(11)
+        ])
+        first = self.client.get(reverse('posts:index')).content.decode()
+        second = self.client.get(
+            reverse('posts:index'), {'page': 2}
+        ).content.decode()
+        self.assertIn('Тестовый пост 10', first)
+        self.assertNotIn('Тестовый пост 0<', first)
+        self.assertIn('Тестовый пост 0<', second)
+        self.assertEqual(feed_cache.stats()['misses'], 2)
+
+
+CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    }
+})
+class SharedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_fragment_while_locked(self):
+        """Пока фрагмент пересобирает другой воркер, отдаётся старый."""
+        key = feed_cache.make_key('index', ['p:1'])
+        self.assertEqual(feed_cache.get_or_render(key, lambda: 'old'), 'old')
+        feed_cache.bump_generation()
+        cache.add(feed_cache.lock_key(key), 1)
+        self.assertEqual(feed_cache.get_or_render(key, lambda: 'new'), 'old')
+        cache.delete(feed_cache.lock_key(key))
+        self.assertEqual(feed_cache.get_or_render(key, lambda: 'new'), 'new')
+        self.assertEqual(feed_cache.stats()['stale'], 1)
+
+    def test_concurrent_bumps(self):
+        """Смены поколения из разных процессов не теряются."""
+        generation = feed_cache.get_generation()
+        _in_workers(_bump)
+        self.assertEqual(
+            feed_cache.get_generation(), generation + WORKERS * BUMPS
+        )
+
+    def test_concurrent_lock(self):
+        """Каждый фрагмент пересобирает ровно один процесс."""
+        for number in range(BUMPS):
+            cache.set(f'feed:test:{number}', (None, 'old'), None)
+        rendered = _in_workers(_lock)
+        self.assertEqual([sum(row) for row in zip(*rendered)], [1] * BUMPS)
+
+    def test_concurrent_render_once(self):
+        """Из процессов, разом заставших устаревший фрагмент, его
+        пересобирает один, остальные отдают старый."""
+        key = feed_cache.make_key('index', ['p:1'])
+        feed_cache.get_or_render(key, lambda: 'old')
+        feed_cache.bump_generation()
+        log = os.path.join(CACHE_DIR, 'renders.log')
+        values = _in_workers(_render, key, log)
+        with open(log) as file:
+            self.assertEqual(file.read().count('render'), 1)
+        self.assertEqual(sorted(values), ['new'] + ['old'] * (WORKERS - 1))
+
+    def test_group_and_profile_cached(self):
+        """Лента группы и профиль кешируются в общем бэкенде."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Тестовый пост'
+        )
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).content
+                Post.objects.filter(pk=post.pk).update(text='Без сигнала')
+                self.assertEqual(self.client.get(url).content, first)
+                Post.objects.filter(pk=post.pk).update(text='Тестовый пост')
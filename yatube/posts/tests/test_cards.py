@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import TemplateSyntaxError, engines
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import card_cache, cards, feed_cache
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Иван.П')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def render(self, source, **context):
+        return engines['django'].from_string(
+            '{% load feed_tags %}' + source
+        ).render(context)
+
+    def test_route_url_matches_reverse(self):
+        """Подстановка в развёрнутый маршрут совпадает с reverse()."""
+        routes = cards.Routes()
+        self.assertEqual(
+            routes.profile(self.user.username),
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertEqual(
+            routes.detail(42), reverse('posts:post_detail', args=[42])
+        )
+
+    def test_post_card_links(self):
+        """Карточки содержат те же ссылки, что и {% url %}."""
+        content = self.render(
+            '{% for post in posts %}{% post_card post %}{% endfor %}',
+            posts=Post.objects.for_feed(),
+        )
+        self.assertEqual(content.count('<article>'), 2)
+        for url in (
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:group_list', args=['test_slug']),
+        ):
+            with self.subTest(url=url):
+                self.assertIn(f'href="{url}"', content)
+        self.assertEqual(content.count('все записи группы'), 1)
+        content = self.render(
+            '{% post_card post show_group=False %}', post=self.post
+        )
+        self.assertNotIn('все записи группы', content)
+        with self.assertRaises(TemplateSyntaxError):
+            self.render('{% post_card post colour=1 %}', post=self.post)
+
+    def test_feeds_use_post_card(self):
+        """Ленты выводят посты через post_card, без include на пост."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertTemplateUsed(response, 'includes/post_card.html')
+                self.assertTemplateNotUsed(response, 'includes/article.html')
+                self.assertContains(response, 'Тестовый пост')
+
+
+class CardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:index')
+
+    def get_index(self):
+        # Фрагмент ленты целиком тоже кешируется: сбрасываем его, чтобы
+        # страница собиралась из карточек.
+        feed_cache.bump_generation()
+        return self.client.get(self.url)
+
+    def test_page_assembled_from_cached_cards(self):
+        """Повторная сборка страницы не рендерит карточки заново."""
+        self.get_index()
+        with mock.patch.object(
+            card_cache, 'get_many', wraps=card_cache.get_many
+        ) as get_many:
+            response = self.get_index()
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args[0][0]), 3)
+        self.assertTemplateNotUsed(response, 'includes/post_card.html')
+        self.assertContains(response, 'Тестовый пост 2')
+
+    def test_version_changes(self):
+        """Правка поста и смена имени автора дают новую карточку."""
+        self.get_index()
+        post = self.posts[0]
+        post.text = 'Исправленный пост'
+        post.save()
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertContains(response, 'Автор: Иван', count=3)
+        self.assertNotContains(response, 'Тестовый пост 0')
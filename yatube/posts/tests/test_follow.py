@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Post
+from core import lru
+
+from ..models import Follow, Group, Post, TimelineEntry
 
 
 User = get_user_model()
@@ -75,3 +80,121 @@ class FollowModelTest(TestCase):
         authors2 = Follow.objects.filter(user=self.user)
         cnt2 = len(authors2)
         self.assertEqual(cnt2, cnt)
+
+    def test_timeline_fan_out(self):
+        """Пост автора раскладывается по лентам подписчиков"""
+        post = Post.objects.create(author=self.user2, text='Тестовый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.user2.username}))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_timeline_backfill(self):
+        """Подписка переносит старые посты автора в ленту"""
+        Post.objects.create(author=self.user3, text='Старый пост')
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.user3.username}))
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0].text, 'Старый пост')
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_fan_out_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении"""
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.user3.username}))
+        Post.objects.create(author=self.user3, text='Популярный пост')
+        Post.objects.create(author=self.user2, text='Обычный пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(author=self.user3).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Обычный пост', 'Популярный пост'])
+
+
+class FollowButtonTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(4)
+        ]
+        for author in cls.authors:
+            Post.objects.create(
+                author=author, group=cls.group, text='Тестовый пост'
+            )
+        Post.objects.create(author=cls.reader, text='Свой пост')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        lru.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def buttons(self, content, name):
+        """Авторы, для которых на странице есть ссылка ``name``."""
+        return [
+            author.username for author in [self.reader] + self.authors
+            if reverse(name, kwargs={'username': author.username}) in content
+        ]
+
+    def test_buttons_state(self):
+        """Кнопки отражают подписки, своих постов и гостей не касаются."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+        ):
+            with self.subTest(url=url):
+                content = self.authorized_client.get(url).content.decode()
+                self.assertEqual(
+                    self.buttons(content, 'posts:profile_unfollow'),
+                    ['author0']
+                )
+                self.assertEqual(
+                    self.buttons(content, 'posts:profile_follow'),
+                    ['author1', 'author2', 'author3']
+                )
+                content = self.client.get(url).content.decode()
+                self.assertNotIn('Подписаться', content)
+
+    def test_state_resolved_once_per_page(self):
+        """Подписки на всех авторов страницы — не больше одного запроса."""
+        url = reverse('posts:index')
+        for limit in (0, 1000):
+            with self.subTest(limit=limit), \
+                    override_settings(FOLLOW_STATE_CACHE_LIMIT=limit):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                follow_queries = [
+                    query for query in queries
+                    if 'posts_follow' in query['sql']
+                ]
+                self.assertEqual(len(follow_queries), 1)
+
+    def test_follow_refreshes_cached_feed(self):
+        """Подписка меняет закешированную ленту и ETag."""
+        url = reverse('posts:index')
+        response = self.authorized_client.get(url)
+        etag = response['ETag']
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author1'}
+        ))
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author1'}),
+            response.content.decode()
+        )
@@ -1,13 +1,16 @@
 import shutil
 import tempfile
+import tracemalloc
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
+from .. import thumbnails
 from ..models import Group, Post
 
 
@@ -153,3 +156,109 @@ class PostFormTests(TestCase):
                 image = response.context.get('post')
                 expected = post.image
                 self.assertEqual(image.image, expected)
+
+    def test_thumbnail_generated_in_background(self):
+        """Лента показывает заглушку, пока миниатюра не готова."""
+        cache.clear()
+        post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            image=self.uploaded
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'bg-light')
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.image_thumbnail)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image_thumbnail)
+
+    def test_thumbnail_scheduled_after_commit(self):
+        """Новая картинка ставит миниатюру в пул после коммита, а правка
+        без смены картинки — нет."""
+        callbacks = []
+        with mock.patch.object(thumbnails, '_executor') as executor, \
+                mock.patch('posts.thumbnails.transaction.on_commit',
+                           side_effect=callbacks.append):
+            post = Post.objects.create(
+                author=self.user, text='Тестовый пост', image=self.uploaded
+            )
+            self.assertEqual(len(callbacks), 1)
+            executor.submit.assert_not_called()
+            callbacks.pop()()
+            executor.submit.assert_called_once_with(thumbnails._work, post.pk)
+            post.text = 'Новый текст'
+            post.save()
+            self.assertEqual(callbacks, [])
+            Post.objects.filter(pk=post.pk).update(image_thumbnail='old.jpg')
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                data={'text': 'Новый текст', 'image': SimpleUploadedFile(
+                    name='other.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                )}
+            )
+            self.assertEqual(len(callbacks), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.image_thumbnail, '')
+
+    def test_no_pool_without_workers(self):
+        """Без потоков миниатюр пул не создаётся."""
+        self.assertEqual(settings.THUMBNAIL_WORKERS, 0)
+        self.assertIsNone(thumbnails._executor)
+
+    def test_connections_closed_only_in_workers(self):
+        """Соединения закрывает только задача пула, а не построение
+        в потоке запроса."""
+        with mock.patch('posts.thumbnails.close_old_connections') as close:
+            thumbnails._run(0)
+            close.assert_not_called()
+            thumbnails._work(0)
+            close.assert_called_once_with()
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_oversized_image_rejected(self):
+        """Слишком большой файл отбрасывается ещё при загрузке."""
+        upload = SimpleUploadedFile(
+            name='big.gif',
+            content=self.small_gif + b'\0' * 4096,
+            content_type='image/gif'
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый текст', 'image': upload}
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.filter(text='Тестовый текст').exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1)
+    def test_image_dimensions_checked(self):
+        """Размеры картинки проверяются по заголовку."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Тестовый текст', 'image': self.uploaded}
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 2x1 слишком велика.'
+        )
+
+    def test_upload_memory_is_bounded(self):
+        """Загрузка идёт на диск кусками, а не целиком в память."""
+        size = 3 * 1024 * 1024
+        upload = SimpleUploadedFile(
+            name='big.gif',
+            content=self.small_gif + b'\0' * size,
+            content_type='image/gif'
+        )
+        request = RequestFactory().post('/create/', {'image': upload})
+        tracemalloc.start()
+        try:
+            files = request.FILES
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertTrue(hasattr(files['image'], 'temporary_file_path'))
+        self.assertLess(peak, size // 4)
@@ -0,0 +1,121 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import lru
+
+from .. import group_cache, lookups
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class GroupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other = Group.objects.create(
+            title='Other_group',
+            slug='other_slug',
+            description='Другая группа',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user, group=cls.group, text=f'Тестовый пост {i}')
+            for i in range(12)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        lru.clear()
+
+    def test_hot_entry(self):
+        """Запись группы хранит число постов и id свежих постов."""
+        entry = group_cache.get_hot(self.group.pk)
+        self.assertEqual(entry['count'], 12)
+        self.assertEqual(
+            entry['ids'],
+            list(self.group.posts.values_list('pk', flat=True))
+        )
+
+    def test_cached_page_queries(self):
+        """После первого запроса группа и список id берутся из кеша."""
+        self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                lookups.get_group('test_slug').pk, self.group.pk
+            )
+            self.assertEqual(group_cache.get_hot(self.group.pk)['count'], 12)
+
+    def test_new_post_prepended(self):
+        """Новый пост дописывается в начало списка без пересборки."""
+        group_cache.get_hot(self.group.pk)
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост'
+        )
+        with self.assertNumQueries(0):
+            entry = group_cache.get_hot(self.group.pk)
+        self.assertEqual(entry['count'], 13)
+        self.assertEqual(entry['ids'][0], post.pk)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'})
+        )
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_group_change_invalidates(self):
+        """Перенос поста сбрасывает записи обеих групп."""
+        group_cache.get_hot(self.group.pk)
+        group_cache.get_hot(self.other.pk)
+        post = self.group.posts.first()
+        post.group = self.other
+        post.save()
+        self.assertEqual(group_cache.get_hot(self.group.pk)['count'], 11)
+        self.assertEqual(
+            group_cache.get_hot(self.other.pk)['ids'], [post.pk]
+        )
+
+    def test_slug_rename_invalidates(self):
+        """Смена slug убирает группу из кеша по старому адресу."""
+        lookups.get_group('other_slug')
+        self.other.slug = 'renamed_slug'
+        self.other.save()
+        self.assertIsNone(lookups.get_group('other_slug'))
+        self.assertEqual(
+            lookups.get_group('renamed_slug').pk, self.other.pk
+        )
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'other_slug'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_deep_pages_from_queryset(self):
+        """Страницы за пределами списка читаются из базы."""
+        group_cache.get_hot(self.group.pk)
+        hot = group_cache.HotPosts(self.group.pk, self.group.posts.all())
+        self.assertEqual(len(hot), 12)
+        self.assertEqual(list(hot[:10]), list(self.group.posts.all()[:10]))
+        self.assertEqual(
+            list(hot[10:20]), list(self.group.posts.all()[10:20])
+        )
+
+    def test_warm_command(self):
+        """Команда прогревает группы с наибольшим числом постов."""
+        out = StringIO()
+        call_command('warm_group_cache', top=1, stdout=out)
+        self.assertIn('Прогрето групп: 1', out.getvalue())
+        with self.assertNumQueries(0):
+            lookups.get_group('test_slug')
+            group_cache.get_hot(self.group.pk)
+        self.assertIsNone(cache.get(group_cache._hot_key(self.other.pk)))
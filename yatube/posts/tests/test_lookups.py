@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import lru
+
+from .. import lookups
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class LookupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Иван', last_name='Петров'
+        )
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.user, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        lru.clear()
+
+    def test_hot_lookup_skips_db(self):
+        """Повторный поиск автора и группы не ходит в базу."""
+        lookups.get_author('auth')
+        lookups.get_group('test_slug')
+        with self.assertNumQueries(0):
+            author = lookups.get_author('auth')
+            group = lookups.get_group('test_slug')
+        self.assertEqual(author, self.user)
+        self.assertEqual(author.get_full_name(), 'Иван Петров')
+        self.assertEqual(group.title, 'Test_group')
+        self.assertEqual(lookups.authors.stats()['hits'], 1)
+
+    def test_instances_not_shared(self):
+        """Каждый вызов получает свой экземпляр."""
+        first = lookups.get_author('auth')
+        first.username = 'changed'
+        self.assertEqual(lookups.get_author('auth').username, 'auth')
+
+    def test_rename_invalidates(self):
+        """Сохранение пользователя сбрасывает старое и новое имя."""
+        lookups.get_author('auth')
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIsNone(lookups.get_author('auth'))
+        self.assertEqual(lookups.get_author('renamed').pk, self.user.pk)
+        self.user.username = 'auth'
+        self.user.save()
+
+    def test_delete_invalidates(self):
+        """Удалённый пользователь пропадает из кеша."""
+        user = User.objects.create_user(username='gone')
+        lookups.get_author('gone')
+        user.delete()
+        self.assertIsNone(lookups.get_author('gone'))
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'gone'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_page_fresh_counters(self):
+        """Счётчики профиля читаются из базы, а не из кеша автора."""
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        self.client.get(url)
+        Post.objects.create(author=self.user, text='Ещё пост')
+        response = self.client.get(url)
+        self.assertEqual(response.context['author'].profile.posts_count, 2)
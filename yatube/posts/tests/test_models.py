@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, Profile
 
 User = get_user_model()
 
@@ -50,3 +53,55 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Коммент'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        post.refresh_from_db()
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(profile.posts_count, 1)
+        self.assertEqual(profile.followers_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.delete()
+        profile.refresh_from_db()
+        self.assertEqual(
+            (profile.posts_count, profile.followers_count), (0, 0)
+        )
+
+    def test_edit_keeps_comments_count(self):
+        """Сохранение старого экземпляра поста не затирает счётчик."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        Comment.objects.create(post=post, author=self.reader, text='Коммент')
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {i}') for i in range(3)
+        ])
+        Profile.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Profile.posts_count: исправлено 1', out.getvalue())
+        self.assertEqual(Profile.objects.get(user=self.user).posts_count, 3)
+        self.assertTrue(Profile.objects.filter(user=self.reader).exists())
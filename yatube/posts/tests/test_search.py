@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post, SearchPosting
+
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.user2 = User.objects.create_user(username='auth2')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.once = Post.objects.create(
+            author=cls.user, text='Ёжик в тумане'
+        )
+        cls.twice = Post.objects.create(
+            author=cls.user2,
+            group=cls.group,
+            text='Ежик, ежик и снова туман'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про котов')
+
+    def found(self, **params):
+        response = self.client.get(reverse('posts:post_search'), params)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_ranked_results(self):
+        """Находятся посты со всеми словами, частые выше."""
+        self.assertEqual(self.found(q='ежик'), [self.twice.pk, self.once.pk])
+        self.assertEqual(self.found(q='ежик туман'), [self.twice.pk])
+        self.assertEqual(self.found(q='собака'), [])
+
+    def test_filters(self):
+        """Результаты фильтруются по группе и автору."""
+        self.assertEqual(
+            self.found(q='ежик', group='test_slug'), [self.twice.pk]
+        )
+        self.assertEqual(self.found(q='ежик', author='auth'), [self.once.pk])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.other.text = 'Про ежиков'
+        self.other.save()
+        self.assertEqual(self.found(q='ежиков'), [self.other.pk])
+        self.assertEqual(self.found(q='котов'), [])
+        self.other.delete()
+        self.assertFalse(
+            SearchPosting.objects.filter(term='ежиков').exists()
+        )
+
+    def test_cursor_pages(self):
+        """Выдача листается курсором без повторов."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Туман номер {i}') for i in range(12)
+        ])
+        search.rebuild()
+        first = self.client.get(
+            reverse('posts:post_search'), {'q': 'туман'}
+        ).context['page_obj']
+        second = self.client.get(
+            reverse('posts:post_search'),
+            {'q': 'туман', 'after': first.next_cursor}
+        ).context['page_obj']
+        ids = [post.pk for post in first] + [post.pk for post in second]
+        self.assertEqual(len(ids), 13)
+        self.assertEqual(len(set(ids)), 13)
+
+    def test_cursor_stable_when_posts_added(self):
+        """Новые посты между страницами не сдвигают ранги выдачи."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Туман номер {i}') for i in range(9)
+        ] + [
+            Post(author=self.user2, text='Туман туман')
+        ])
+        search.rebuild()
+        url = reverse('posts:post_search')
+        response = self.client.get(url, {'q': 'туман'})
+        first = response.context['page_obj']
+        page_query = response.context['page_query']
+        # Новые посты без слова запроса меняют только его idf.
+        for i in range(30):
+            Post.objects.create(author=self.user, text=f'Про котов {i}')
+        second = self.client.get(
+            f'{url}?{page_query}after={first.next_cursor}'
+        ).context['page_obj']
+        ids = [post.pk for post in first] + [post.pk for post in second]
+        self.assertEqual(len(ids), 11)
+        self.assertEqual(len(set(ids)), 11)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт через тот же индекс."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ежик'}
+        )
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.once.pk, self.twice.pk}
+        )
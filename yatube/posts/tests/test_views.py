@@ -1,9 +1,18 @@
+import time
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from ..models import Comment, Group, Post
+from core import lru
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, Profile
 
 
 User = get_user_model()
@@ -30,6 +39,7 @@ class PostViewTests(TestCase):
                  text=f'Тестовый пост {i}')
             for i in range(ALL_POSTS)
         ])
+        counters.reconcile()
         cls.post = Post.objects.get(pk=4)
         Comment.objects.create(
             post=cls.post,
@@ -95,6 +105,20 @@ class PostViewTests(TestCase):
                         len(response.context["page_obj"].object_list), count
                     )
 
+    def test_profile_without_profile_row(self):
+        """Страница автора без строки Profile открывается, а профиль
+        создаётся со счётчиками по данным."""
+        Profile.objects.filter(user=self.user).delete()
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.user.username})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), FIRST_PAGE_POSTS)
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.posts_count, ALL_POSTS)
+        self.assertEqual(profile.followers_count, 0)
+
     def test_post_detail_correct_context_list(self):
         """Шаблон post_detail сформирован правильно."""
         response = self.guest_client.get(reverse(
@@ -148,3 +172,258 @@ class PostViewTests(TestCase):
             'posts:post_detail',
             kwargs={'post_id': self.post.pk})
         )
+
+
+@override_settings(FEED_PAGINATION='cursor')
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.user,
+                 group=cls.group,
+                 text=f'Тестовый пост {i}')
+            for i in range(ALL_POSTS)
+        ])
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def test_cursor_pages(self):
+        """Курсоры after/before листают ленту без пропусков и повторов."""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.client.get(
+                    url, {'after': first.next_cursor}
+                ).context['page_obj']
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    [post.pk for post in first] + [post.pk for post in second],
+                    expected
+                )
+                back = self.client.get(
+                    url, {'before': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.pk for post in back], expected[:FIRST_PAGE_POSTS]
+                )
+                self.assertFalse(back.has_previous())
+
+    def test_empty_page_after_cursor(self):
+        """Пустая страница за последним постом ведёт назад."""
+        url = self.urls[0]
+        first = self.client.get(url).context['page_obj']
+        after = first.next_cursor
+        second = self.client.get(url, {'after': after}).context['page_obj']
+        Post.objects.filter(pk__in=[post.pk for post in second]).delete()
+        response = self.client.get(url, {'after': after})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 0)
+        back = self.client.get(
+            url, {'before': page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(back), FIRST_PAGE_POSTS)
+        self.assertEqual(
+            [post.pk for post in back],
+            [post.pk for post in first]
+        )
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.client.get(self.urls[0], {'after': '!!!'})
+        self.assertEqual(len(response.context['page_obj']), FIRST_PAGE_POSTS)
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for i in range(ALL_POSTS):
+            author = User.objects.create_user(username=f'author{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            post = Post.objects.create(
+                author=author, group=cls.group, text=f'Тестовый пост {i}'
+            )
+            Comment.objects.create(post=post, author=author, text='Коммент')
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def count_queries(self, url, page_size):
+        cache.clear()
+        lru.clear()
+        with mock.patch('posts.views.AMT_SHOW_POSTS', page_size):
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от размера страницы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_queries(url, 2),
+                    self.count_queries(url, FIRST_PAGE_POSTS)
+                )
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'Коммент {i}')
+            for i in range(25)
+        ])
+
+    def test_post_detail_first_comments(self):
+        """На странице поста только первая порция комментариев."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        ))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Коммент 0')
+        self.assertContains(response, 'data-load-more')
+
+    def test_load_more_comments(self):
+        """Следующая порция отдаётся фрагментом и в JSON."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(first['comments']), 20)
+        rest = self.client.get(
+            url, {'format': 'json', 'after': first['next']}
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in rest['comments']],
+            [f'Коммент {i}' for i in range(20, 25)]
+        )
+        self.assertIsNone(rest['next'])
+        response = self.client.get(url, {'after': first['next']})
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertContains(response, 'Коммент 24')
+        self.assertNotContains(response, 'data-load-more')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test_group',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с валидатором получает 304 без шаблонов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                with mock.patch('time.time', return_value=time.time() + 2):
+                    response = self.client.get(url)
+                    self.assertTrue(response.has_header('Last-Modified'))
+                    again = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                    self.assertEqual(again.status_code, 304)
+                    self.assertEqual(again.templates, [])
+                    again = self.client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+                    )
+                    self.assertEqual(again.status_code, 304)
+
+    def test_edit_seen_with_if_modified_since(self):
+        """Правка поста отдаёт новую страницу на запрос только
+        с If-Modified-Since."""
+        now = int(time.time())
+        with mock.patch('time.time') as clock:
+            for number, url in enumerate(self.urls):
+                with self.subTest(url=url):
+                    now += 10
+                    # Первый запрос запоминает ещё не известное время
+                    # подписок автора.
+                    clock.return_value = now - 1
+                    self.client.get(url)
+                    clock.return_value = now + 0.2
+                    since = self.client.get(url)['Last-Modified']
+                    clock.return_value = now + 0.4
+                    self.post.text = 'Правка %s' % number
+                    self.post.save()
+                    clock.return_value = now + 0.6
+                    # Секунда правки не истекла: время не отдаётся.
+                    response = self.client.get(url)
+                    self.assertFalse(response.has_header('Last-Modified'))
+                    clock.return_value = now + 2
+                    response = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=since
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertContains(response, 'Правка %s' % number)
+                    self.assertNotEqual(response['Last-Modified'], since)
+
+    def test_etag_changes_with_content(self):
+        """ETag меняется при новом комментарии, подписке и для
+        другого посетителя."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertNotEqual(
+                    self.authorized_client.get(url)['ETag'], etag
+                )
+                Comment.objects.create(
+                    post=self.post, author=self.reader, text='Коммент'
+                )
+                self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        etag = self.authorized_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,74 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Миниатюры всех используемых размеров строятся в пуле потоков сразу
+после коммита сохранения с новой картинкой (сигнал ``post_save``),
+а шаблоны читают готовый URL из ``Post.image_thumbnail``. Пока
+миниатюры нет, выводится заглушка, так что отрисовка ленты никогда
+не ждёт декодирования картинки.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+# Размер для карточек лент и страницы поста; URL хранится в image_thumbnail.
+CARD = ('960x339', {'crop': 'center', 'upscale': True})
+SIZES = (CARD,)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails',
+) if settings.THUMBNAIL_WORKERS > 0 else None
+
+
+def generate(post_id):
+    """Строит миниатюры поста и сохраняет URL карточки."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    urls = []
+    for geometry, options in SIZES:
+        urls.append(get_thumbnail(post.image, geometry, **options).url)
+    # Картинку могли заменить, пока строилась миниатюра.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        image_thumbnail=urls[SIZES.index(CARD)]
+    )
+    if updated:
+        feed_cache.bump_generation()
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры поста %s', post_id)
+
+
+def _work(post_id):
+    # Соединение потока пула не закроет ни один обработчик запроса.
+    try:
+        _run(post_id)
+    finally:
+        close_old_connections()
+
+
+def _submit(post_id):
+    if _executor is not None:
+        _executor.submit(_work, post_id)
+    else:
+        _run(post_id)
+
+
+def schedule(post):
+    """Сбрасывает старую миниатюру и ставит построение новой в очередь."""
+    Post.objects.filter(pk=post.pk).update(image_thumbnail='')
+    if post.image:
+        transaction.on_commit(lambda: _submit(post.pk))
@@ -0,0 +1,111 @@
+"""Материализованная лента подписок.
+
+Новый пост раскладывается по лентам подписчиков автора (fan-out on
+write), поэтому ``follow_index`` читает страницу одним проходом по
+индексу ``(user, pub_date)``. Авторы, у которых подписчиков больше
+``settings.TIMELINE_FANOUT_LIMIT``, помечаются ``fan_out_on_read``:
+их посты не копируются, а подмешиваются в ленту при чтении.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, Profile, TimelineEntry
+
+
+BATCH_SIZE = 500
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def is_fan_out_on_read(author_id):
+    return Profile.objects.filter(
+        user_id=author_id, fan_out_on_read=True
+    ).exists()
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_fan_out_on_read(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True))
+    _bulk_insert([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    ])
+
+
+def add_author(user_id, author_id):
+    """Переносит посты автора в ленту нового подписчика."""
+    add_authors(user_id, [author_id])
+
+
+def add_authors(user_id, author_ids):
+    """Переносит в ленту подписчика посты сразу нескольких авторов.
+
+    Число запросов не зависит от числа авторов: слишком популярные
+    помечаются ``fan_out_on_read`` одним ``UPDATE``, посты остальных
+    выбираются одним запросом.
+    """
+    profiles = Profile.objects.filter(user_id__in=author_ids)
+    profiles.filter(
+        fan_out_on_read=False,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(fan_out_on_read=True)
+    on_read = profiles.filter(fan_out_on_read=True).values('user_id')
+    posts = (Post.objects.filter(author_id__in=author_ids)
+             .exclude(author_id__in=on_read)
+             .values_list('pk', 'author_id', 'pub_date'))
+    _bulk_insert([
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in posts.iterator()
+    ])
+
+
+def remove_author(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    remove_authors(user_id, [author_id])
+
+
+def remove_authors(user_id, author_ids):
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя с нуля."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    add_authors(user_id, list(
+        Follow.objects.filter(user_id=user_id)
+        .values_list('author_id', flat=True)
+    ))
+
+
+def follow_feed(user):
+    """Посты ленты подписок, от новых к старым."""
+    read_authors = list(
+        Follow.objects.filter(user=user, author__profile__fan_out_on_read=True)
+        .values_list('author_id', flat=True)
+    )
+    if not read_authors:
+        return (Post.objects.filter(timeline_entries__user=user)
+                .order_by('-timeline_entries__pub_date'))
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=read_authors)
+    )
@@ -0,0 +1,334 @@
+"""Перенос контента между инстансами в формате NDJSON.
+
+Каждая строка — одна запись с ключом ``model``: сначала пользователи
+и группы, затем посты, комментарии и подписки. Пользователи и группы
+связываются по ``username`` и ``slug``, а посты и комментарии получают
+id «исходный + смещение», так что импорт не держит в памяти таблиц
+соответствия и может быть безопасно повторён с любого места. Диапазон
+таких id резервируется в автоинкременте до первой вставки, поэтому
+посты, созданные на сайте во время импорта, его не занимают.
+
+Картинки не встраиваются в файл: в записи поста лежит путь
+относительно ``MEDIA_ROOT``, а сами файлы копируются в отдельный
+каталог рядом с выгрузкой.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, Max, Value, When
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed_cache, group_cache, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+BATCH_SIZE = 500
+# В одном UPDATE на строку идут два параметра CASE и один IN: 900
+# укладываются в лимит параметров старых SQLite.
+DATES_BATCH_SIZE = 300
+
+# Модель -> (поле для values() -> ключ записи).
+EXPORT_FIELDS = (
+    ('user', User, {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+    }),
+    ('group', Group, {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    ('post', Post, {
+        'id': 'id',
+        'author__username': 'author',
+        'group__slug': 'group',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    }),
+    ('comment', Comment, {
+        'id': 'id',
+        'post_id': 'post',
+        'author__username': 'author',
+        'text': 'text',
+        'created': 'created',
+    }),
+    ('follow', Follow, {
+        'user__username': 'user',
+        'author__username': 'author',
+    }),
+)
+
+
+def export_records():
+    """Все записи выгрузки по одной, с постоянным расходом памяти."""
+    for name, model, fields in EXPORT_FIELDS:
+        rows = (model.objects.order_by('pk').values(*fields)
+                .iterator(chunk_size=BATCH_SIZE))
+        for row in rows:
+            record = {'model': name}
+            record.update(
+                (key, row[path]) for path, key in fields.items()
+            )
+            yield record
+
+
+class Encoder(DjangoJSONEncoder):
+    """Даты — с микросекундами, которые DjangoJSONEncoder отбрасывает."""
+
+    def default(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return super().default(value)
+
+
+def dump(record):
+    return json.dumps(record, cls=Encoder, ensure_ascii=False)
+
+
+def copy_media(name, source, target):
+    """Копирует файл ``name`` между каталогами, если его там ещё нет."""
+    destination = os.path.join(target, name)
+    if os.path.exists(destination):
+        return True
+    if not source.exists(name):
+        return False
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with source.open(name) as src, open(destination, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    return True
+
+
+def restore_media(name, source):
+    """Кладёт файл из каталога выгрузки в хранилище под тем же именем."""
+    if default_storage.exists(name):
+        return True
+    path = os.path.join(source, name)
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as src:
+        default_storage.save(name, File(src))
+    return True
+
+
+# Модели с id «исходный + смещение».
+OFFSET_MODELS = {
+    'post': Post,
+    'comment': Comment,
+}
+
+
+def id_spans(records):
+    """Наибольшие исходные id постов и комментариев в записях."""
+    spans = dict.fromkeys(OFFSET_MODELS, 0)
+    for record in records:
+        if record['model'] in spans:
+            spans[record['model']] = max(
+                spans[record['model']], record['id']
+            )
+    return spans
+
+
+def _reserve(model, span):
+    """Сдвигает автоинкремент таблицы на ``span`` и возвращает смещение:
+    id от смещения + 1 до смещения + ``span`` больше никто не получит."""
+    table = model._meta.db_table
+    top = model.objects.aggregate(top=Max('pk'))['top'] or 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            row = cursor.fetchone()
+            offset = max(top, row[0] if row else 0)
+            cursor.execute(
+                'DELETE FROM sqlite_sequence WHERE name = %s', [table]
+            )
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, offset + span],
+            )
+        elif connection.vendor == 'postgresql':
+            sequence = "pg_get_serial_sequence(%s, 'id')"
+            cursor.execute(f'SELECT nextval({sequence})', [table])
+            offset = max(top, cursor.fetchone()[0])
+            cursor.execute(
+                f'SELECT setval({sequence}, %s)', [table, offset + span]
+            )
+        else:
+            raise NotImplementedError(
+                'Резервирование id не поддерживается для %s'
+                % connection.vendor
+            )
+    return offset
+
+
+def initial_offsets(spans):
+    """Резервирует id для постов и комментариев выгрузки и возвращает
+    смещения; ``spans`` — результат ``id_spans()``."""
+    with transaction.atomic():
+        return {
+            name: _reserve(model, spans[name])
+            for name, model in OFFSET_MODELS.items()
+        }
+
+
+def _ids(model, field, values):
+    return dict(
+        model.objects.filter(**{f'{field}__in': set(values)})
+        .values_list(field, 'pk')
+    )
+
+
+def _users(records, *keys):
+    return _ids(
+        User, 'username',
+        [record[key] for record in records for key in keys]
+    )
+
+
+def _build_users(records, offsets):
+    password = make_password(None)
+    return [
+        User(
+            username=record['username'],
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            email=record['email'],
+            password=password,
+        )
+        for record in records
+    ]
+
+
+def _build_groups(records, offsets):
+    return [
+        Group(
+            slug=record['slug'],
+            title=record['title'],
+            description=record['description'],
+        )
+        for record in records
+    ]
+
+
+def _build_posts(records, offsets):
+    users = _users(records, 'author')
+    groups = _ids(
+        Group, 'slug', [record['group'] for record in records]
+    )
+    return [
+        Post(
+            id=record['id'] + offsets['post'],
+            author_id=users[record['author']],
+            group_id=groups.get(record['group']),
+            text=record['text'],
+            pub_date=parse_datetime(record['pub_date']),
+            image=record['image'],
+        )
+        for record in records
+        if record['author'] in users
+    ]
+
+
+def _build_comments(records, offsets):
+    users = _users(records, 'author')
+    return [
+        Comment(
+            id=record['id'] + offsets['comment'],
+            post_id=record['post'] + offsets['post'],
+            author_id=users[record['author']],
+            text=record['text'],
+            created=parse_datetime(record['created']),
+        )
+        for record in records
+        if record['author'] in users
+    ]
+
+
+def _build_follows(records, offsets):
+    users = _users(records, 'user', 'author')
+    return [
+        Follow(user_id=users[record['user']],
+               author_id=users[record['author']])
+        for record in records
+        if record['user'] in users and record['author'] in users
+    ]
+
+
+BUILDERS = {
+    'user': (User, _build_users),
+    'group': (Group, _build_groups),
+    'post': (Post, _build_posts),
+    'comment': (Comment, _build_comments),
+    'follow': (Follow, _build_follows),
+}
+
+# Поля с ``auto_now_add``: ``bulk_create`` ставит в них текущее время.
+DATE_FIELDS = {
+    'post': 'pub_date',
+    'comment': 'created',
+}
+
+
+def restore_dates(model, field, dates):
+    """Проставляет строкам ``{pk: дата}`` исходные даты."""
+    pks = list(dates)
+    for start in range(0, len(pks), DATES_BATCH_SIZE):
+        batch = pks[start:start + DATES_BATCH_SIZE]
+        model.objects.filter(pk__in=batch).update(**{field: Case(
+            *[When(pk=pk, then=Value(dates[pk])) for pk in batch],
+            output_field=model._meta.get_field(field),
+        )})
+
+
+def import_batch(name, records, offsets):
+    """Сохраняет пачку записей одной модели в отдельной транзакции.
+
+    Повтор уже сохранённой пачки после сбоя ничего не меняет: посты
+    и комментарии с уже занятыми id пропускаются, а пользователи,
+    группы и подписки сверяются по уникальным ключам.
+    """
+    model, build = BUILDERS[name]
+    objects = build(records, offsets)
+    with transaction.atomic():
+        if name not in OFFSET_MODELS:
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+            return len(objects)
+        # Диапазон зарезервирован, так что занятый id — это строка
+        # прошлой попытки. Любой другой конфликт — ошибка, а не повод
+        # молча потерять запись.
+        existing = set(
+            model.objects.filter(pk__in=[obj.pk for obj in objects])
+            .values_list('pk', flat=True)
+        )
+        objects = [obj for obj in objects if obj.pk not in existing]
+        field = DATE_FIELDS[name]
+        # bulk_create перезапишет даты в объектах, поэтому они берутся
+        # заранее.
+        dates = {obj.pk: getattr(obj, field) for obj in objects}
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        restore_dates(model, field, dates)
+    return len(objects)
+
+
+def rebuild_derived():
+    """Пересобирает то, что обычно ведут сигналы: ``bulk_create`` их
+    обходит."""
+    counters.reconcile()
+    followers = (Follow.objects.values_list('user_id', flat=True)
+                 .distinct().order_by())
+    for user_id in followers.iterator():
+        timeline.rebuild(user_id)
+    search.rebuild()
+    group_cache.clear()
+    feed_cache.bump_generation()
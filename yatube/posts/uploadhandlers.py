@@ -0,0 +1,40 @@
+"""Потоковая загрузка картинок с ограничением размера.
+
+Обработчик стоит первым в ``FILE_UPLOAD_HANDLERS`` перед
+``TemporaryFileUploadHandler``: загрузка пишется на диск кусками по
+``chunk_size``, а как только файл превышает ``POST_IMAGE_MAX_SIZE``,
+данные перестают сохраняться и в форму вместо файла попадает
+``RejectedUpload``. Память на запрос ограничена размером куска.
+"""
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отброшенный при загрузке из-за превышения размера."""
+
+    rejected = True
+
+    def __init__(self, name, content_type, size):
+        super().__init__(None, name, content_type, size)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            # Остаток файла дочитывается из сокета, но никуда не пишется.
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.received
+            )
+        return None
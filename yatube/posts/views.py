@@ -1,53 +1,80 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
-from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from core.replicas import read_from_replica
+
+from . import (
+    conditional, counters, group_cache, lookups, search, timeline
+)
+from .follow_state import FollowState
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Comment, Follow, Post
+from .paginators import CursorPaginator, paginate
 
 
 AMT_SHOW_POSTS = 10
+AMT_SHOW_COMMENTS = 20
 
 
+@read_from_replica
+@condition(etag_func=conditional.index_etag,
+           last_modified_func=conditional.index_last_modified)
 def index(request):
-    posts = Post.objects.select_related('group')
+    posts = Post.objects.for_feed()
     template = 'posts/index.html'
-    paginator = Paginator(posts, AMT_SHOW_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, AMT_SHOW_POSTS)
     index = True
     context = {
         'page_obj': page_obj,
-        'index': index
+        'index': index,
+        'follow_state': FollowState(request.user, page_obj),
     }
     return render(request, template, context)
 
 
+@read_from_replica
+@condition(etag_func=conditional.group_etag,
+           last_modified_func=conditional.group_last_modified)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = lookups.get_group(slug)
+    if group is None:
+        raise Http404
+    posts = group.posts.for_feed()
+    count = None
+    if settings.FEED_PAGINATION == 'page':
+        posts = group_cache.HotPosts(group.pk, posts)
+        count = posts.count()
     template = 'posts/group_list.html'
-    paginator = Paginator(posts, AMT_SHOW_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, posts, AMT_SHOW_POSTS, count=count)
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'follow_state': FollowState(request.user, page_obj),
     }
     return render(request, template, context)
 
 
+@read_from_replica
+@condition(etag_func=conditional.profile_etag,
+           last_modified_func=conditional.profile_last_modified)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = lookups.get_author(username)
+    if author is None:
+        raise Http404
+    author.profile = counters.get_profile(author)
+    posts = author.posts.for_feed()
     following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user).exists()
     )
     template = 'posts/profile.html'
-    paginator = Paginator(posts, AMT_SHOW_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, posts, AMT_SHOW_POSTS, count=author.profile.posts_count
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -56,9 +83,15 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@read_from_replica
+@condition(etag_func=conditional.post_etag,
+           last_modified_func=conditional.post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post_id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__profile'),
+        pk=post_id
+    )
+    comments = comments_page(request, post_id)
     form = CommentForm(request.POST or None)
     template = 'posts/post_detail.html'
     context = {
@@ -69,6 +102,78 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def comments_page(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    paginator = CursorPaginator(
+        comments, AMT_SHOW_COMMENTS, ordering=('created', 'pk')
+    )
+    return paginator.page(after=request.GET.get('after'))
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(request, post_id)
+    wants_json = (
+        request.GET.get('format') == 'json'
+        or 'application/json' in request.META.get('HTTP_ACCEPT', '')
+    )
+    if wants_json:
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+def post_search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    page_query = ''
+    if form.is_valid():
+        query = form.cleaned_data['q']
+        # Все страницы выдачи ранжируются с idf первой страницы.
+        idf = search.weights(query, request.GET.get('idf'))
+        rows = search.ranked(
+            query,
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+            idf=idf,
+        )
+        paginator = CursorPaginator(
+            rows,
+            AMT_SHOW_POSTS,
+            ordering=('-score', '-post_id'),
+            transform=search.posts_for,
+        )
+        page_obj = paginator.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        params = dict(form.cleaned_data, idf=search.weights_token(idf))
+        page_query = urlencode({
+            key: value for key, value in params.items() if value
+        }) + '&'
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': page_query,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -114,14 +219,11 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
-    authors = (Follow.objects.filter(user=request.user)
-               .values_list('author_id', flat=True))
-    posts = Post.objects.filter(author_id__in=authors)
-    paginator = Paginator(posts, AMT_SHOW_POSTS)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = timeline.follow_feed(request.user).for_feed()
+    page_obj = paginate(request, posts, AMT_SHOW_POSTS)
     follow = True
     context = {
         'page_obj': page_obj,
@@ -132,7 +234,9 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    foll_author = get_object_or_404(User, username=username)
+    foll_author = lookups.get_author(username)
+    if foll_author is None:
+        raise Http404
     if request.user == foll_author:
         return redirect('posts:profile', username=username)
     Follow.objects.get_or_create(user=request.user, author=foll_author)
@@ -141,7 +245,9 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    foll_author = get_object_or_404(User, username=username)
-    follower = get_object_or_404(Follow, author=foll_author, user=request.user)
+    foll_author_id = lookups.get_author_id(username)
+    follower = get_object_or_404(
+        Follow, author_id=foll_author_id, user=request.user
+    )
     follower.delete()
     return redirect('posts:profile', username=username)
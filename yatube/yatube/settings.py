@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -46,27 +47,45 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Шаблоны разбираются один раз на процесс кешированным загрузчиком, даже
+# при DEBUG, и прогреваются при старте (yatube/wsgi.py). Для правки
+# шаблонов без перезапуска YATUBE_TEMPLATE_CACHE=0 отключает кеш.
+TEMPLATE_CACHE = os.environ.get('YATUBE_TEMPLATE_CACHE', '1') == '1'
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -84,13 +103,42 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Бэкенд core.db.sqlite3 включает WAL и остальные PRAGMA при открытии
+# соединения (см. DEFAULT_PRAGMAS), а соединение живёт CONN_MAX_AGE
+# секунд и переиспользуется между запросами.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'busy_timeout': int(
+                    os.environ.get('YATUBE_SQLITE_BUSY_TIMEOUT', 5000)
+                ),
+            },
+        },
     }
 }
 
+# Реплики для чтения лент перечисляются через запятую в окружении:
+# YATUBE_REPLICAS=/var/lib/yatube/replica1.sqlite3,/var/lib/...
+# После записи сессия читает из default ещё REPLICA_PIN_SECONDS секунд.
+DATABASE_REPLICAS = []
+
+for number, name in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,10 +194,92 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Общий для всех воркеров кеш задаётся через окружение, например
+# YATUBE_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# YATUBE_CACHE_LOCATION=/var/tmp/yatube_cache
+# или memcached на локальном сокете (LOCATION=unix:/tmp/memcached.sock).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.environ.get(
+            'YATUBE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', ''),
     }
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Режим пагинации лент: 'page' (?page=N) или 'cursor' (?after=/?before=)
+FEED_PAGINATION = 'page'
+
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, а подмешиваются в ленту подписок при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Авторы по username и группы по slug кешируются в памяти процесса
+# (не больше LOOKUP_CACHE_SIZE записей на не дольше LOOKUP_CACHE_TIMEOUT
+# секунд) поверх общего кеша.
+LOOKUP_CACHE_SIZE = 1024
+
+LOOKUP_CACHE_TIMEOUT = 30
+
+# Множество подписок пользователя для кнопок «Подписаться» в лентах
+# кешируется, если подписок не больше этого числа; 0 — не кешировать.
+FOLLOW_STATE_CACHE_LIMIT = 1000
+
+# HTML карточек постов кешируется по версии содержимого и живёт не
+# дольше суток: новые версии получают новые ключи.
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Число потоков, которые строят миниатюры картинок постов;
+# 0 — строить сразу после сохранения в том же потоке
+THUMBNAIL_WORKERS = 2
+
+# Тестовая база живёт в памяти одного соединения, и потокам пула её
+# не видно: в тестах миниатюры строятся сразу.
+if sys.argv[1:2] == ['test'] or 'pytest' in sys.modules:
+    THUMBNAIL_WORKERS = 0
+
+# Загрузки пишутся на диск кусками; файлы больше POST_IMAGE_MAX_SIZE
+# отбрасываются ещё при чтении запроса, а картинки с числом пикселей
+# больше POST_IMAGE_MAX_PIXELS отклоняются по заголовку до декодирования.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandlers.LimitedUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+POST_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 4096 * 4096
+
+# Профилирование запросов: заголовок Server-Timing, лог с ротацией и
+# сводка по маршрутам на /core/profiling/ (для сотрудников).
+REQUEST_PROFILING = os.environ.get('YATUBE_PROFILING') == '1'
+
+PROFILING_SLOW_QUERIES = 5
+
+PROFILING_LOG = os.environ.get(
+    'YATUBE_PROFILING_LOG', os.path.join(BASE_DIR, 'profiling.log')
+)
+
+if REQUEST_PROFILING:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'profiling': {
+                'class': 'logging.handlers.RotatingFileHandler',
+                'filename': PROFILING_LOG,
+                'maxBytes': 10 * 1024 * 1024,
+                'backupCount': 5,
+            },
+        },
+        'loggers': {
+            'yatube.profiling': {
+                'handlers': ['profiling'],
+                'level': 'INFO',
+                'propagate': False,
+            },
+        },
+    }